@@ -1,12 +1,15 @@
+import asyncio
+
 from fastapi import FastAPI, Request, status
 from fastapi.responses import ORJSONResponse, JSONResponse
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from redis.asyncio import Redis
 from contextlib import asynccontextmanager
 
-from src.api.v1 import auth, auth_social, roles
+from src.api.v1 import auth, auth_social, roles, jwks
 from src.core.config import settings
 from src.core.jaeger import configure_tracer, jaeger_settings
+from src.core.keys import keyring
 from src.core.ratelimit import check_login_ratelimit
 from src.db import redis
 
@@ -19,7 +22,13 @@ from pydantic import ValidationError
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     redis.redis = Redis(host=settings.redis.host, port=settings.redis.port)
+    keys_task = None
+    if settings.jwt.asymmetric:
+        await keyring.sync(redis.redis)
+        keys_task = asyncio.create_task(keyring.run(redis.redis))
     yield
+    if keys_task:
+        keys_task.cancel()
     await redis.redis.close()
 
 app = FastAPI(
@@ -50,6 +59,7 @@ async def validation_exception_handler(request: Request, exc: ValidationError):
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(auth_social.router, prefix="/auth-social", tags=["social"])
 app.include_router(roles.router, prefix="/roles", tags=["roles"])
+app.include_router(jwks.router, prefix="/.well-known", tags=["jwks"])
 
 if jaeger_settings.debug:
     configure_tracer()
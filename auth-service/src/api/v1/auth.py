@@ -81,7 +81,8 @@ async def refresh(
         status_code=status.HTTP_204_NO_CONTENT, 
         response_class=Response,
         description="Выход из системы. "
-                "Аннулирует текущий refresh-токен."
+                "Аннулирует текущий refresh-токен "
+                "(и access-токен, если он передан в заголовке Authorization)."
 )
 async def logout(
     payload: RefreshIn,
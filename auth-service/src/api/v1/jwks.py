@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+
+from src.core.config import settings
+from src.core.keys import keyring
+
+router = APIRouter()
+
+
+@router.get(
+    "/jwks.json",
+    description="Публичные ключи для офлайн-проверки access-токенов (JWKS). "
+                "При HS256 список ключей пуст.",
+)
+async def jwks():
+    keys = keyring.jwks() if settings.jwt.asymmetric else {"keys": []}
+    return ORJSONResponse(
+        keys,
+        headers={"Cache-Control": f"public, max-age={settings.jwt.jwks_max_age_sec}"},
+    )
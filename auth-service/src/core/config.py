@@ -33,11 +33,22 @@ class PostgresSettings(BaseSettings):
 
 class JwtSettings(BaseSettings):
     secret: str = Field(..., validation_alias="JWT_SECRET")
-    algorithm: str = "HS256"
+    # алгоритм подписи access-токенов: HS256 (общий секрет) или RS256/ES256 (ключи + JWKS)
+    algorithm: str = Field("HS256", validation_alias="JWT_ALGORITHM")
     issuer: str = Field("auth-service", validation_alias="JWT_ISS")
     audience: str = Field("movies-service", validation_alias="JWT_AUD")
     access_ttl_min: int = Field(15, validation_alias="ACCESS_TTL_MIN")
     refresh_ttl_days: int = Field(14, validation_alias="REFRESH_TTL_DAYS")
+    key_rotation_hours: int = Field(24, validation_alias="JWT_KEY_ROTATION_HOURS")
+    key_overlap_min: int = Field(60, validation_alias="JWT_KEY_OVERLAP_MIN")
+    keys_sync_sec: int = Field(60, validation_alias="JWT_KEYS_SYNC_SEC")
+    # шифрует приватные ключи RS256/ES256 в Redis; знает его только auth-service
+    keys_secret: str | None = Field(None, validation_alias="JWT_KEYS_SECRET")
+    jwks_max_age_sec: int = Field(300, validation_alias="JWKS_MAX_AGE_SEC")
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.algorithm in ("RS256", "ES256")
 
 
 class RateLimitSettings(BaseSettings):
@@ -4,8 +4,13 @@ from datetime import datetime, timedelta, timezone
 from jose import jwt
 from jose.exceptions import ExpiredSignatureError, JWTError
 from src.core.config import settings
+from src.core.keys import keyring
 from fastapi import HTTPException, status
 
+# refresh-токены проверяет только auth-service, поэтому они всегда подписаны общим секретом
+# и не зависят от ротации ключей access-токенов
+REFRESH_ALGORITHM = "HS256"
+
 
 def now_utc() -> datetime:
     return datetime.now(timezone.utc)
@@ -30,7 +35,11 @@ def create_access_token(sub: str, roles: list[str]) -> tuple[str, int]:
         "exp": int(exp.timestamp()),
         "jti": make_jti(),
     }
-    token = jwt.encode(payload, settings.jwt.secret, algorithm=settings.jwt.algorithm)
+    if settings.jwt.asymmetric:
+        key = keyring.signing_key()
+        token = jwt.encode(payload, key.private_pem, algorithm=key.alg, headers={"kid": key.kid})
+    else:
+        token = jwt.encode(payload, settings.jwt.secret, algorithm=settings.jwt.algorithm)
     ttl = int((exp - now_utc()).total_seconds())
     return token, ttl
 
@@ -46,16 +55,36 @@ def create_refresh_token(sub: str) -> tuple[str, datetime]:
         "exp": int(exp.timestamp()),
         "jti": make_jti(),
     }
-    token = jwt.encode(payload, settings.jwt.secret, algorithm=settings.jwt.algorithm)
+    token = jwt.encode(payload, settings.jwt.secret, algorithm=REFRESH_ALGORITHM)
     return token, exp
 
 
+def decode_access(token: str) -> dict:
+    """Проверка access-токена; ошибки — JWTError/ExpiredSignatureError из jose."""
+    if settings.jwt.asymmetric:
+        key = keyring.public_key(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key")
+    else:
+        key = settings.jwt.secret
+    payload = jwt.decode(
+        token,
+        key,
+        algorithms=[settings.jwt.algorithm],
+        audience=settings.jwt.audience,
+        issuer=settings.jwt.issuer,
+    )
+    if payload.get("typ") == "refresh":
+        raise JWTError("Wrong token type")
+    return payload
+
+
 def decode_refresh(token: str) -> dict:
     try:
         payload = jwt.decode(
             token,
             settings.jwt.secret,
-            algorithms=[settings.jwt.algorithm],
+            algorithms=[REFRESH_ALGORITHM],
             audience=settings.jwt.audience,
             issuer=settings.jwt.issuer,
         )
@@ -1,8 +1,9 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
+from jose import JWTError
 from jose.exceptions import ExpiredSignatureError
-from src.core.config import settings
+from src.core.jwt import decode_access
+from src.core.revocation import is_revoked
 
 bearer = HTTPBearer(auto_error=True)
 
@@ -12,14 +13,7 @@ async def current_user_claims(
 ) -> dict:
     token = cred.credentials
     try:
-        payload = jwt.decode(
-            token,
-            settings.jwt.secret,            
-            algorithms=[settings.jwt.algorithm],
-            audience=settings.jwt.audience,
-            issuer=settings.jwt.issuer,
-        )
-        return payload  # в payload уже есть sub, roles, exp и т.д.
+        payload = decode_access(token)
     except ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,6 +24,12 @@ async def current_user_claims(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail={"error": "token_invalid", "message": "Invalid token"},
         )
+    if await is_revoked(payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"error": "token_revoked", "message": "Access token revoked"},
+        )
+    return payload  # в payload уже есть sub, roles, exp и т.д.
 
 
 def require_roles(*needed: str):
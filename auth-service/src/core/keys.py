@@ -0,0 +1,185 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, asdict
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+from redis.asyncio import Redis
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SigningKey:
+    kid: str
+    alg: str
+    private_pem: str
+    public_jwk: dict
+    created_at: float
+
+
+def generate_key(alg: str) -> SigningKey:
+    if alg == "RS256":
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif alg == "ES256":
+        private = ec.generate_private_key(ec.SECP256R1())
+    else:
+        raise ValueError(f"Unsupported asymmetric algorithm: {alg}")
+
+    private_pem = private.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    ).decode()
+    public_pem = private.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+
+    kid = uuid.uuid4().hex
+    public_jwk = {**jwk.construct(public_pem, alg).to_dict(), "kid": kid, "use": "sig"}
+    return SigningKey(kid=kid, alg=alg, private_pem=private_pem, public_jwk=public_jwk, created_at=time.time())
+
+
+class KeyRing:
+    """Набор ключей подписи access-токенов, общий для всех инстансов через Redis.
+
+    Новый ключ создаётся раз в rotation_sec и публикуется в JWKS заранее,
+    а подписывать им начинаем только через activation_sec — к этому времени
+    его успевают подхватить остальные инстансы. Старый ключ остаётся в JWKS
+    ещё overlap_sec после замены, пока не истекут подписанные им токены.
+
+    Redis общий с movies-service и ETL, поэтому приватный ключ лежит в нём
+    только зашифрованным секретом JWT_KEYS_SECRET, который есть лишь у auth-service.
+    """
+
+    REDIS_KEY = "jwt:keys"
+    LOCK_KEY = "jwt:keys:rotate"
+
+    def __init__(self, alg: str, rotation_sec: int, overlap_sec: int, sync_sec: int, secret: str | None):
+        self.alg = alg
+        self._secret = secret.encode() if secret else None
+        self.rotation_sec = rotation_sec
+        self.overlap_sec = overlap_sec
+        self.sync_sec = sync_sec
+        self.activation_sec = 2 * sync_sec
+        self._keys: list[SigningKey] = []
+
+    async def sync(self, r: Redis) -> None:
+        """Подтянуть ключи из Redis, при необходимости выпустить новый и удалить отслужившие."""
+        if self._secret is None:
+            raise RuntimeError("JWT_KEYS_SECRET is required for RS256/ES256")
+        now = time.time()
+        keys = await self._load(r)
+
+        if not keys or now - keys[-1].created_at >= self.rotation_sec:
+            if key := await self._issue(r):
+                keys.append(key)
+        while not keys:
+            # ключ прямо сейчас выпускает другой инстанс; если он упал, блокировка
+            # истечёт через sync_sec и ключ выпустим мы — без ключа логин отдал бы 500
+            await asyncio.sleep(0.5)
+            keys = await self._load(r)
+            if not keys and (key := await self._issue(r)):
+                keys = [key]
+
+        retired = [k.kid for k in self._retired(keys, now)]
+        if retired:
+            await r.hdel(self.REDIS_KEY, *retired)
+            logger.info("JWT signing keys retired: %s", ", ".join(retired))
+            keys = [k for k in keys if k.kid not in retired]
+
+        self._keys = keys
+
+    async def _issue(self, r: Redis) -> SigningKey | None:
+        if not await r.set(self.LOCK_KEY, "1", nx=True, ex=self.sync_sec):
+            return None
+        key = generate_key(self.alg)
+        await r.hset(self.REDIS_KEY, key.kid, json.dumps(self._dump(key)))
+        logger.info("JWT signing key %s issued", key.kid)
+        return key
+
+    async def run(self, r: Redis) -> None:
+        while True:
+            await asyncio.sleep(self.sync_sec)
+            try:
+                await self.sync(r)
+            except Exception as e:
+                logger.error(f"Не удалось синхронизировать ключи JWT: {e}")
+
+    def signing_key(self) -> SigningKey:
+        if not self._keys:
+            raise RuntimeError("No JWT signing keys loaded")
+        now = time.time()
+        active = [k for k in self._keys if k.created_at + self.activation_sec <= now]
+        # при первом запуске активных ключей ещё нет — подписываем единственным
+        return active[-1] if active else self._keys[0]
+
+    def public_key(self, kid: str | None) -> dict | None:
+        for k in self._keys:
+            if k.kid == kid:
+                return k.public_jwk
+        return None
+
+    def jwks(self) -> dict:
+        return {"keys": [k.public_jwk for k in self._keys]}
+
+    async def _load(self, r: Redis) -> list[SigningKey]:
+        raw = await r.hgetall(self.REDIS_KEY)
+        keys, leaked = [], []
+        for kid, value in raw.items():
+            data = json.loads(value)
+            if "private_pem" in data:
+                # ключ старого формата лежал открытым текстом — подписывать им больше нельзя
+                leaked.append(kid)
+            elif data["alg"] == self.alg:
+                keys.append(self._parse(data))
+        if leaked:
+            await r.hdel(self.REDIS_KEY, *leaked)
+            logger.warning("JWT signing keys stored in plaintext removed: %d", len(leaked))
+        return sorted(keys, key=lambda k: k.created_at)
+
+    def _dump(self, key: SigningKey) -> dict:
+        data = asdict(key)
+        private = serialization.load_pem_private_key(data.pop("private_pem").encode(), password=None)
+        data["private_pem_encrypted"] = private.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.BestAvailableEncryption(self._secret),
+        ).decode()
+        return data
+
+    def _parse(self, data: dict) -> SigningKey:
+        encrypted = data.pop("private_pem_encrypted")
+        private = serialization.load_pem_private_key(encrypted.encode(), password=self._secret)
+        private_pem = private.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        ).decode()
+        return SigningKey(private_pem=private_pem, **data)
+
+    def _retired(self, keys: list[SigningKey], now: float) -> list[SigningKey]:
+        retired = []
+        for key, successor in zip(keys, keys[1:]):
+            replaced_at = successor.created_at + self.activation_sec
+            if now > replaced_at + self.overlap_sec:
+                retired.append(key)
+        return retired
+
+
+keyring = KeyRing(
+    alg=settings.jwt.algorithm,
+    rotation_sec=settings.jwt.key_rotation_hours * 3600,
+    # старый ключ нужен, пока живы подписанные им access-токены
+    overlap_sec=max(settings.jwt.key_overlap_min, settings.jwt.access_ttl_min) * 60,
+    sync_sec=settings.jwt.keys_sync_sec,
+    secret=settings.jwt.keys_secret,
+)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+import time
+
+from src.core.config import settings
+from src.db import redis as redis_db
+
+# Лента отзывов access-токенов для потребителей, проверяющих токены офлайн.
+# Записи: {"type": "jti", "jti", "exp"} — отозван один токен;
+#         {"type": "user", "sub", "before"} — отозваны все токены пользователя, выпущенные раньше before.
+STREAM_KEY = "auth:revocations"
+
+
+def _jti_key(jti: str) -> str:
+    return f"revoked:jti:{jti}"
+
+
+def _user_key(user_id: str) -> str:
+    return f"revoked:user:{user_id}"
+
+
+def _min_stream_id() -> str:
+    # старше максимального срока жизни access-токена записи уже никому не нужны
+    horizon = time.time() - settings.jwt.access_ttl_min * 60 - 60
+    return f"{int(horizon * 1000)}-0"
+
+
+async def revoke_token(jti: str, exp: int) -> None:
+    r = redis_db.redis
+    if r is None:
+        return
+    ttl = int(exp - time.time())
+    if ttl <= 0:
+        return
+    await r.set(_jti_key(jti), 1, ex=ttl)
+    await r.xadd(STREAM_KEY, {"type": "jti", "jti": jti, "exp": exp}, minid=_min_stream_id())
+
+
+async def revoke_user_tokens(user_id: str) -> None:
+    r = redis_db.redis
+    if r is None:
+        return
+    before = int(time.time())
+    await r.set(_user_key(user_id), before, ex=settings.jwt.access_ttl_min * 60)
+    await r.xadd(STREAM_KEY, {"type": "user", "sub": user_id, "before": before}, minid=_min_stream_id())
+
+
+async def is_revoked(claims: dict) -> bool:
+    r = redis_db.redis
+    if r is None:
+        return False
+    jti_flag, before = await r.mget(_jti_key(str(claims.get("jti"))), _user_key(str(claims.get("sub"))))
+    if jti_flag is not None:
+        return True
+    return before is not None and int(claims.get("iat", 0)) < int(before)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status, Request
+from jose import JWTError
 
 from src.domain.repositories.user_repo import UserRepository
 from src.domain.repositories.role_repo import RoleRepository
@@ -8,9 +9,10 @@ from src.domain.repositories.session_repo import SessionRepository
 from src.domain.repositories.audit_repo import AuditRepository
 
 from src.core.security import hash_password, verify_password
-from src.core.jwt import create_access_token, create_refresh_token, sha256_hex, decode_refresh
+from src.core.jwt import create_access_token, create_refresh_token, sha256_hex, decode_refresh, decode_access
 from src.core.ratelimit import check_login_ratelimit, bump_login_fail_counter, reset_login_counters
 from src.core.refresh_cache import get_cached_session, cache_session, delete_cached_session
+from src.core.revocation import revoke_token, revoke_user_tokens
 
 from src.models.schemas.auth import RefreshIn, TokenPair, LoginIn
 from src.models.schemas.user import UserCreate, UserChangeLoginIn, UserChangePasswordIn
@@ -198,6 +200,17 @@ class AuthService:
         await delete_cached_session(refresh_hash)
         await db.commit()
 
+        # 4) если вместе с refresh прислали access-токен — отзываем и его,
+        #    иначе он останется рабочим у офлайн-проверяющих сервисов до exp
+        auth = request.headers.get("authorization", "")
+        if auth.lower().startswith("bearer "):
+            try:
+                access = decode_access(auth[7:])
+            except JWTError:
+                return
+            if str(access.get("sub")) == str(claims["sub"]) and access.get("jti"):
+                await revoke_token(access["jti"], int(access["exp"]))
+
     async def change_login(self, db: AsyncSession, user_id: str, payload: UserChangeLoginIn):
         # 1) проверить, что логин свободен
         if await self.user_repo.get_by_login(db, payload.new_login):
@@ -228,6 +241,8 @@ class AuthService:
             hashes: Iterable[str] = await self.session_repo.get_hashes_by_user(db, user_id)
             for h in hashes:
                 await delete_cached_session(h)
+            # 4) и все уже выданные access-токены пользователя
+            await revoke_user_tokens(user_id)
         except Exception:
             # не валим запрос, если Redis недоступен
             pass
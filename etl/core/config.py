@@ -62,6 +62,10 @@ class AppSettings(BaseSettings):
         ProducerConfig(source_type='genre', table='content.genre', state_key='genre_producer', enrich=True),
     ]
     batch_size: int = Field(100, validation_alias='BATCH_SIZE')
+    # поток событий об индексации: movies-service по нему сбрасывает кэш
+    events_stream: str = Field('etl:indexed', validation_alias='ETL_EVENTS_STREAM')
+    # sorted set-ы рейтингов фильмов по жанрам: movies-service читает их вместо ES
+    rankings_prefix: str = Field('films:rank', validation_alias='ETL_RANKINGS_PREFIX')
     sleep_time: int = Field(1, validation_alias='SLEEP_TIME')
 
 
@@ -1,17 +1,24 @@
+import json
 import logging
+from typing import Optional
 from elasticsearch import Elasticsearch, helpers, ConnectionError
+from redis import Redis
 from core.utils import backoff
 
 class ElasticsearchLoader:
-    def __init__(self, es_conn: Elasticsearch, index_name: str):
+    def __init__(self, es_conn: Elasticsearch, index_name: str,
+                 redis_conn: Optional[Redis] = None, events_stream: Optional[str] = None):
         self.es_conn = es_conn
         self.index_name = index_name
+        self.redis_conn = redis_conn
+        self.events_stream = events_stream
 
     @backoff(exceptions=(ConnectionError,), service_name="Elasticsearch")
     def load_to_es(self, records: list[dict]):
         """
         Загружает пачку документов в Elasticsearch.
         В случае сбоя соединения будет повторять попытки благодаря декоратору @backoff.
+        После загрузки публикует id документов в поток событий, чтобы потребители сбросили кэш.
         """
         if not records:
             return
@@ -33,7 +40,23 @@ class ElasticsearchLoader:
                 # Backoff их не поймает, они будут просто залогированы.
                 logging.error(f"Ошибки при загрузке данных (не связаны с соединением): {failed}")
 
+            self.publish_indexed([str(record['id']) for record in records])
+
         except Exception as e:
             # Эта секция может поймать другие ошибки, не ConnectionError
             logging.error(f"Непредвиденная ошибка при bulk-загрузке в Elasticsearch: {e}")
             raise
+
+    def publish_indexed(self, ids: list[str]):
+        """Кладёт в поток событие {index, ids}. Сбой публикации загрузку не валит — кэш доживёт до TTL."""
+        if not self.redis_conn or not self.events_stream or not ids:
+            return
+        try:
+            self.redis_conn.xadd(
+                self.events_stream,
+                {"index": self.index_name, "ids": json.dumps(ids)},
+                maxlen=10000,
+                approximate=True,
+            )
+        except Exception as e:
+            logging.warning(f"Не удалось опубликовать событие индексации для '{self.index_name}': {e}")
@@ -0,0 +1,145 @@
+import json
+import logging
+from typing import Optional
+
+from elasticsearch import Elasticsearch, helpers
+from redis import Redis
+
+# фильмы без рейтинга — в конце списка, как при сортировке -imdb_rating в ES
+MISSING_SCORE = -1
+# формат наборов: movies-service читает их, только если ready начинается с этой версии
+READY_VERSION = "2"
+
+
+class FilmRankings:
+    """
+    Рейтинги фильмов в sorted set-ах Redis: общий ({prefix}:all) и по одному
+    на жанр ({prefix}:genre:{genre_id}), score — imdb_rating. Рядом, в хэше
+    {prefix}:short, — JSON FilmShort каждого фильма ({id, title, imdb_rating}).
+    По ним movies-service отдаёт списки с сортировкой -imdb_rating без запроса
+    в ES и без карточек фильмов: страница склеивается из байтов хэша.
+
+    Набор обновляется после каждой загрузки фильмов в ES. Ключ {prefix}:ready
+    появляется после полной пересборки из индекса — пока его нет, сервис
+    ходит в ES, чтобы не отдать неполный рейтинг. В ready записан uuid
+    индекса, из которого наборы собраны: если индекс пересоздали, uuid
+    другой — ETL сбрасывает наборы и собирает их заново, а сервис до
+    этого в них не смотрит.
+    """
+
+    def __init__(self, redis_conn: Redis, prefix: str):
+        self.redis_conn = redis_conn
+        self.prefix = prefix
+        # жанры каждого фильма: при смене жанров фильм убирается из старых наборов
+        self.genres_key = f"{prefix}:film_genres"
+        self.short_key = f"{prefix}:short"
+        self.ready_key = f"{prefix}:ready"
+
+    def all_key(self) -> str:
+        return f"{self.prefix}:all"
+
+    def genre_key(self, genre_id: str) -> str:
+        return f"{self.prefix}:genre:{genre_id}"
+
+    def update(self, records: list[dict]):
+        """Обновляет позиции фильмов из пачки документов индекса movies."""
+        if not records:
+            return
+        ids = [str(record['id']) for record in records]
+        previous = self.redis_conn.hmget(self.genres_key, ids)
+
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for record, film_id, old in zip(records, ids, previous):
+            # фильм без названия в списки не попадает — как в FilmService._short_items сервиса
+            ranked = bool(record.get('title'))
+            genres = sorted({str(g['id']) for g in record.get('genre') or [] if g.get('id')}) if ranked else []
+
+            if ranked:
+                score = self.score(record)
+                pipe.zadd(self.all_key(), {film_id: score})
+                for genre_id in genres:
+                    pipe.zadd(self.genre_key(genre_id), {film_id: score})
+                pipe.hset(self.short_key, film_id, self.short(film_id, record))
+            else:
+                pipe.zrem(self.all_key(), film_id)
+                pipe.hdel(self.short_key, film_id)
+            for genre_id in set(json.loads(old) if old else []) - set(genres):
+                pipe.zrem(self.genre_key(genre_id), film_id)
+            pipe.hset(self.genres_key, film_id, json.dumps(genres))
+        pipe.execute()
+
+    def ensure_built(self, es_conn: Elasticsearch, index_name: str):
+        """
+        Пересобирает наборы из индекса, если они собраны не из него (ready нет,
+        он другой версии или от пересозданного индекса).
+        Сбой пересборки не валит ETL — попытка повторится в следующем цикле.
+        """
+        try:
+            ready = self.ready_value(self.index_uuid(es_conn, index_name))
+        except Exception as e:
+            logging.warning(f"Не удалось получить uuid индекса '{index_name}': {e}")
+            return
+        if self.redis_conn.get(self.ready_key) == ready:
+            return
+        logging.info(f"Рейтинги фильмов в Redis не собраны из индекса '{index_name}' — собираем...")
+        try:
+            self.reset()
+            count = self.rebuild(es_conn, index_name, ready)
+        except Exception as e:
+            logging.warning(f"Не удалось собрать рейтинги фильмов: {e}")
+            return
+        logging.info(f"Рейтинги фильмов собраны: {count} фильмов.")
+
+    def reset(self):
+        """Удаляет наборы; ready — первым, чтобы сервис сразу перестал их читать."""
+        self.redis_conn.delete(self.ready_key)
+        keys: list[str] = []
+        for key in self.redis_conn.scan_iter(match=f"{self.prefix}:*", count=1000):
+            keys.append(key)
+            if len(keys) >= 1000:
+                self.redis_conn.unlink(*keys)
+                keys = []
+        if keys:
+            self.redis_conn.unlink(*keys)
+
+    def rebuild(self, es_conn: Elasticsearch, index_name: str, ready: str) -> int:
+        docs = helpers.scan(es_conn, index=index_name, query={"_source": ["id", "title", "imdb_rating", "genre"]})
+
+        batch: list[dict] = []
+        count = 0
+        for hit in docs:
+            batch.append(hit['_source'])
+            if len(batch) >= 1000:
+                self.update(batch)
+                count += len(batch)
+                batch = []
+        self.update(batch)
+        count += len(batch)
+
+        self.redis_conn.set(self.ready_key, ready)
+        return count
+
+    @staticmethod
+    def index_uuid(es_conn: Elasticsearch, index_name: str) -> str:
+        resp = es_conn.indices.get_settings(index=index_name, name="index.uuid")
+        (index_settings,) = resp.body.values()
+        return index_settings['settings']['index']['uuid']
+
+    @staticmethod
+    def ready_value(index_uuid: str) -> str:
+        return f"{READY_VERSION}:{index_uuid}"
+
+    @staticmethod
+    def short(film_id: str, record: dict) -> str:
+        """JSON FilmShort сервиса: такие байты уходят клиенту без разбора."""
+        rating = record.get('imdb_rating')
+        return json.dumps(
+            {"id": film_id, "title": record['title'], "imdb_rating": None if rating is None else float(rating)},
+            ensure_ascii=False,
+            separators=(',', ':'),
+        )
+
+    @staticmethod
+    def score(record: dict) -> float:
+        rating: Optional[float] = record.get('imdb_rating')
+        return MISSING_SCORE if rating is None else float(rating)
@@ -47,6 +47,7 @@ class PostgresTransformer:
             movie['actors_names'] = [pname for _, pname in movie['_actors']]
             movie['writers_names'] = [pname for _, pname in movie['_writers']]
             movie['directors_names'] = [pname for _, pname in movie['_directors']]
+            movie['title_suggest'] = self.suggest_input(movie['title'], movie['imdb_rating'])
 
             del movie['_genre']
             del movie['_actors']
@@ -57,6 +58,18 @@ class PostgresTransformer:
 
         return final_list
 
+    @staticmethod
+    def suggest_input(text: str, rating: Optional[float] = None) -> dict:
+        """
+        Значение completion-поля: строка целиком и все её «хвосты» со второго слова,
+        чтобы «wars» находил «Star Wars». Рейтинг фильма поднимает его в подсказках.
+        """
+        words = (text or "").split()
+        suggest = {"input": [" ".join(words[i:]) for i in range(len(words))]}
+        if rating is not None:
+            suggest["weight"] = max(int(rating * 10), 0)
+        return suggest
+
     def transform_genres(self, docs):
             """
             docs — список dict из Producer.extract_docs(...) по content.genre.
@@ -109,9 +122,11 @@ class PostgresTransformer:
                 films = []
                 for fid, roles in roles_by_person.get(pid, {}).items():
                     films.append({"id": fid, "roles": sorted(roles)})
+                full_name = p.get("full_name") or ""
                 result.append({
                     "id": pid,
-                    "full_name": p.get("full_name") or "",
+                    "full_name": full_name,
+                    "full_name_suggest": self.suggest_input(full_name),
                     "films": films,
                 })
 
@@ -31,8 +31,24 @@ create_index() {
   fi
 }
 
+# Добавляет поле в маппинг уже созданного индекса (новые поля добавлять можно)
+add_field() {
+  NAME=$1
+  FIELD=$2
+  MAPPING=$3
+
+  echo "[init-es] Ensuring field '$FIELD' in '$NAME'..."
+  curl -s -X PUT "$ES/$NAME/_mapping" -H "Content-Type: application/json" \
+    --data "{\"properties\": {\"$FIELD\": $MAPPING}}" --fail-with-body > /dev/null
+}
+
 create_index movies /app/schemas/es_movies.json
 create_index genres /app/schemas/es_genres.json
 create_index person /app/schemas/es_person.json
 
+# поля автодополнения для индексов, созданных до их появления в схемах
+SUGGEST='{"type": "completion", "analyzer": "simple", "max_input_length": 100}'
+add_field movies title_suggest "$SUGGEST"
+add_field person full_name_suggest "$SUGGEST"
+
 echo "[init-es] Done."
\ No newline at end of file
@@ -11,6 +11,7 @@ from core.enricher import PostgresEnricher
 from core.merger import PostgresMerger
 from core.transformer import PostgresTransformer
 from core.loader import ElasticsearchLoader
+from core.rankings import FilmRankings
 from core.config import settings
 
 def process_source(config: dict, producers: dict[str, PostgresProducer], enricher: PostgresEnricher, merger: PostgresMerger, transformer: PostgresTransformer, redis_connection: Redis):
@@ -52,9 +53,11 @@ def process_source(config: dict, producers: dict[str, PostgresProducer], enriche
     producer.state.set_state('last_id', last_id)
     logging.info(f"Состояние для '{source_type}' обновлено: modified={last_modified}, id={last_id}\n")
 
-def load_data_to_es(es_loader: ElasticsearchLoader, redis_connection: Redis, queue_name: str = 'processed_movies_queue'):
+def load_data_to_es(es_loader: ElasticsearchLoader, redis_connection: Redis, queue_name: str = 'processed_movies_queue',
+                    rankings: FilmRankings | None = None):
     """
     Извлекает данные из очереди Redis и загружает их в Elasticsearch пачками.
+    После загрузки пачки обновляет рейтинги фильмов в Redis.
     """
     logging.info(f"Проверка очереди '{queue_name}' на наличие данных для загрузки в Elasticsearch...")
 
@@ -65,6 +68,8 @@ def load_data_to_es(es_loader: ElasticsearchLoader, redis_connection: Redis, que
         logging.info(f"Извлечено {len(records_to_load)} документов из Redis для загрузки.")
 
         es_loader.load_to_es(records_to_load)
+        if rankings:
+            rankings.update(records_to_load)
 
         redis_connection.ltrim(queue_name, len(records_to_load), -1)
         logging.info(f"Успешно обработанная пачка удалена из очереди '{queue_name}'.")
@@ -80,7 +85,8 @@ def main():
 
             logging.info("Соединения с Redis и Elasticsearch установлены.")
 
-            loader = ElasticsearchLoader(es_conn, settings.es.index)
+            loader = ElasticsearchLoader(es_conn, settings.es.index, redis_connection, settings.events_stream)
+            rankings = FilmRankings(redis_connection, settings.rankings_prefix)
 
             while True:
                 try:
@@ -101,7 +107,8 @@ def main():
                 except OperationalError as e:
                     logging.warning(f"Не удалось подключиться к PostgreSQL в этом цикле. Повтор через 5 секунд. Ошибка: {e}")
 
-                load_data_to_es(loader, redis_connection, 'processed_movies_queue')
+                load_data_to_es(loader, redis_connection, 'processed_movies_queue', rankings)
+                rankings.ensure_built(es_conn, settings.es.index)
 
                 logging.info(f"--- Все источники обработаны. Пауза {settings.sleep_time} секунд. ---\n")
                 time.sleep(settings.sleep_time)
@@ -85,7 +85,7 @@ def main():
             logging.info("[genres] Соединения с Redis и Elasticsearch установлены.")
 
             # Этот раннер отвечает за индекс жанров
-            genres_loader = ElasticsearchLoader(es_conn, 'genres')
+            genres_loader = ElasticsearchLoader(es_conn, 'genres', redis_connection, settings.events_stream)
 
             while True:
                 try:
@@ -91,7 +91,7 @@ def main():
             logging.info("[person] Соединения с Redis и Elasticsearch установлены.")
 
             # Этот раннер отвечает за индекс жанров
-            person_loader = ElasticsearchLoader(es_conn, 'person')
+            person_loader = ElasticsearchLoader(es_conn, 'person', redis_connection, settings.events_stream)
 
             while True:
                 try:
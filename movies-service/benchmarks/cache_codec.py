@@ -0,0 +1,184 @@
+"""Микробенчмарк пути попадания в кэш: страница списка и карточка фильма.
+
+Запуск из movies-service (нужны переменные окружения сервиса):
+    set -a; . ./.env.example; set +a
+    PYTHONPATH=src python benchmarks/cache_codec.py
+
+Меряется всё, что воркер делает при попадании в локальный кэш, вплоть
+до байтов, отданных в ASGI send:
+  * old      — как до кэша байтов: json.loads + FilmShort(**item) (FilmDetail
+               для карточки), ответ валидируется по response_model
+               и сериализуется FastAPI;
+  * gzip     — FilmService.list_films / get_by_id (блоки и SWR-конверты
+               из LocalCache) + CachedJSONResponse, Accept-Encoding: gzip;
+  * identity — то же без Accept-Encoding: сжатое значение распаковывается.
+
+Redis и ES не нужны: все ключи заранее лежат в LocalCache, до Redis
+попадание не доходит.
+
+Результат (Python 3.11, 1 vCPU, три прогона; в каждом лучшее из 5 повторов,
+мкс на ответ; машина шумная, отсюда разброс):
+
+    page          items     old, us   gzip, us   identity, us   old/gzip
+    list             50     255-355      47-60          48-60      5-7x
+    list           1000   7789-10009   271-323        249-312    29-36x
+    card (gzip)       1     286-365     9-12           41-48     25-40x
+
+Страницы списков собираются из блоков codec.dump_lines и не сжимаются,
+поэтому identity им ничего не стоит; нарезка блока — около 9 мкс из
+времени страницы из 50, остальное — asyncio.gather по блокам, SWR-конверт
+и сам ответ. Карточка больше
+CACHE_COMPRESS_MIN_BYTES лежит в gzip: клиенту без gzip её распаковывают
+на каждый запрос, это около 35 мкс на карточку из 100 персон.
+"""
+import asyncio
+import json
+import time
+import uuid
+from typing import Awaitable, Callable, List
+
+import orjson
+from pydantic import TypeAdapter
+from redis.asyncio import Redis
+
+from api.v1.responses import CachedJSONResponse
+from core.config import settings
+from models.film import FilmDetail, FilmShort, FilmsQuery
+from services import codec
+from services.cache import CacheTags, LocalCache, RedisCache, StaleWhileRevalidate, TieredCache
+from services.film import FilmService
+
+SIZES = (50, 1000)
+REPEAT = 5
+SORT = "-imdb_rating"
+
+list_adapter = TypeAdapter(List[FilmShort])
+detail_adapter = TypeAdapter(FilmDetail)
+
+
+def make_page(size: int) -> list[FilmShort]:
+    return [
+        FilmShort(id=str(uuid.uuid4()), title=f"Film {i}", imdb_rating=round(i % 100 / 10, 1))
+        for i in range(size)
+    ]
+
+
+def make_card() -> FilmDetail:
+    people = [{"id": str(uuid.uuid4()), "name": f"Person {i}"} for i in range(100)]
+    return FilmDetail(
+        id=str(uuid.uuid4()),
+        title="Film",
+        imdb_rating=8.1,
+        description="Description " * 20,
+        genre=[{"id": str(uuid.uuid4()), "name": "Drama"}],
+        actors=people[:80],
+        writers=people[80:90],
+        directors=people[90:],
+    )
+
+
+def make_service(page: list[FilmShort], card: FilmDetail) -> FilmService:
+    """FilmService, у которого блоки страницы и карточка уже в локальном кэше."""
+    # клиент Redis без соединения: при попадании в LocalCache команды не отправляются
+    client = Redis()
+    local = LocalCache(max_size=1000, ttl=3600)
+    block_size = settings.cache.block_size
+    for b in range(-(-len(page) // block_size)):
+        envelope = f"{time.time() + 3600}|".encode() + codec.dump_lines(page[b * block_size:(b + 1) * block_size])
+        local.set(f"films:block:v2:{SORT}:any:{b}", envelope)
+    local.set(f"film:{card.id}", codec.dumps(card))
+
+    cache = TieredCache(local=local, remote=RedisCache(client), client=client)
+    return FilmService(
+        cache=cache,
+        # при попадании в кэш хранилище не нужно
+        storage=None,
+        swr=StaleWhileRevalidate(cache, client, lease_ms=settings.cache.lease_ms),
+        tags=CacheTags(client),
+    )
+
+
+async def send(body: bytes, accept_encoding: bytes | None) -> bytes:
+    """Ответ CachedJSONResponse целиком, как его получит ASGI-сервер."""
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding)] if accept_encoding else []}
+    chunks: list[bytes] = []
+
+    async def collect(message: dict) -> None:
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await CachedJSONResponse(body)(scope, None, collect)
+    return b"".join(chunks)
+
+
+def old_list(cached: str) -> bytes:
+    items = [FilmShort(**item) for item in json.loads(cached)]
+    # так FastAPI готовит ответ с response_model=FilmsListResponse
+    content = list_adapter.validate_python([i.model_dump() for i in items])
+    return orjson.dumps(list_adapter.dump_python(content, mode="json"))
+
+
+def old_card(cached: str) -> bytes:
+    film = FilmDetail(**json.loads(cached))
+    content = detail_adapter.validate_python(film.model_dump())
+    return orjson.dumps(detail_adapter.dump_python(content, mode="json"))
+
+
+async def bench(fn: Callable[[], Awaitable[bytes]], number: int) -> float:
+    """Лучшее из REPEAT время одного вызова, мкс."""
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        for _ in range(number):
+            await fn()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best * 1e6
+
+
+async def row(name: str, items: int, old: Callable, build: Callable[[], Awaitable[bytes]], number: int) -> None:
+    async def gzip() -> bytes:
+        return await send(await build(), b"gzip")
+
+    async def identity() -> bytes:
+        return await send(await build(), None)
+
+    assert orjson.loads(await identity()) == orjson.loads(old()) == codec.loads(await gzip())
+    old_us = min(_time(old, number) for _ in range(REPEAT))
+    gzip_us = await bench(gzip, number)
+    identity_us = await bench(identity, number)
+    print(f"{name:<11} {items:>6} {old_us:>9.1f} {gzip_us:>10.1f} {identity_us:>14.1f} {old_us / gzip_us:>9.0f}x")
+
+
+def _time(fn: Callable[[], bytes], number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - started) / number * 1e6
+
+
+async def main() -> None:
+    print(f"{'page':<11} {'items':>6} {'old, us':>9} {'gzip, us':>10} {'identity, us':>14} {'old/gzip':>10}")
+    card = make_card()
+    for size in SIZES:
+        page = make_page(size)
+        films = make_service(page, card)
+        cached_str = json.dumps([i.model_dump() for i in page])
+        params = FilmsQuery(sort=SORT, page_size=size)
+        await row(
+            "list", size,
+            lambda: old_list(cached_str),
+            lambda: films.list_films(params),
+            number=max(10, 20000 // size),
+        )
+
+    card_str = json.dumps(card.model_dump())
+    await row(
+        "card (gzip)" if codec.is_compressed(codec.dumps(card)) else "card", 1,
+        lambda: old_card(card_str),
+        lambda: films.get_by_id(card.id),
+        number=2000,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
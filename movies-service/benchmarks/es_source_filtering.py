@@ -0,0 +1,73 @@
+"""Бенчмарк запросов списка фильмов к Elasticsearch: полный _source против облегчённого.
+
+Нужен запущенный Elasticsearch с индексом фильмов. Запуск из movies-service:
+    set -a; . ./.env.example; set +a
+    PYTHONPATH=src python benchmarks/es_source_filtering.py
+
+Сравниваются:
+  * full — как раньше: весь _source, подсчёт total, term по жанру вне фильтра;
+  * lean — как в ElasticDataStorage: SHORT_SOURCE, track_total_hits=false,
+           жанр в filter-контексте, request_cache.
+Для каждого варианта — байты ответа и медиана/p95 задержки.
+"""
+import asyncio
+import statistics
+import time
+
+import orjson
+from elasticsearch import AsyncElasticsearch
+
+from core.config import Resource, settings
+from services.film import SHORT_SOURCE, ElasticDataStorage
+
+RUNS = 50
+PAGE_SIZE = 100
+
+
+def full_query(storage: ElasticDataStorage, genre: str | None) -> dict:
+    query = {"nested": {"path": "genre", "query": {"term": {"genre.id": genre}}}} if genre else {"match_all": {}}
+    return {"query": query, "sort": storage._es_sort_from_query("-imdb_rating"), "size": PAGE_SIZE}
+
+
+def lean_query(storage: ElasticDataStorage, genre: str | None) -> dict:
+    return {
+        "query": storage._build_films_query_nested_genre(genre),
+        "sort": storage._es_sort_from_query("-imdb_rating"),
+        "size": PAGE_SIZE,
+        "source_includes": SHORT_SOURCE,
+        "track_total_hits": False,
+        "request_cache": True,
+    }
+
+
+async def measure(es: AsyncElasticsearch, index: str, body: dict) -> tuple[int, list[float]]:
+    latencies = []
+    size = 0
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        resp = await es.search(index=index, **body)
+        latencies.append((time.perf_counter() - started) * 1000)
+        size = len(orjson.dumps(resp.body))
+    return size, latencies
+
+
+async def main() -> None:
+    es = AsyncElasticsearch(hosts=[f"{settings.es.protocol}://{settings.es.host}:{settings.es.port}"])
+    index = settings.es.index_for(Resource.films)
+    storage = ElasticDataStorage(es)
+    try:
+        genres = await es.search(index=settings.es.index_for(Resource.genres), size=1)
+        genre = next((h["_source"]["id"] for h in genres["hits"]["hits"]), None)
+
+        print(f"{'query':<14} {'variant':<6} {'bytes':>9} {'p50, ms':>8} {'p95, ms':>8}")
+        for name, g in (("all films", None), ("by genre", genre)):
+            for variant, build in (("full", full_query), ("lean", lean_query)):
+                size, latencies = await measure(es, index, build(storage, g))
+                p95 = statistics.quantiles(latencies, n=20)[-1]
+                print(f"{name:<14} {variant:<6} {size:>9} {statistics.median(latencies):>8.2f} {p95:>8.2f}")
+    finally:
+        await es.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
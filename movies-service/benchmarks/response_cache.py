@@ -0,0 +1,116 @@
+"""Пропускная способность одного воркера на странице списка фильмов.
+
+Запуск из movies-service (нужны переменные окружения сервиса):
+    set -a; . ./.env.example; set +a
+    PYTHONPATH=src python benchmarks/response_cache.py
+
+Приложение FastAPI поднимается в процессе, запросы идут через
+httpx.ASGITransport — без сети, Redis и ES, так что в цифрах только
+работа воркера над ответом. Блок из CACHE_BLOCK_SIZE фильмов уже лежит
+в памяти, страница — первые 50 фильмов блока:
+  * models   — json.loads + FilmShort(**item), ответ валидируется по
+               response_model и сериализуется FastAPI;
+  * bytes    — страница вырезается из закэшированного блока
+               (codec.split_lines + срез + codec.join), CachedJSONResponse;
+  * response — готовое тело из services.response_cache, CachedJSONResponse.
+
+Результат (Python 3.11, 1 vCPU, два прогона; клиент httpx работает в том же
+процессе и съедает большую часть времени, поэтому абсолютные числа —
+нижняя граница):
+
+      path     req/s  vs bytes
+    models    608-733  0.57-0.61x
+     bytes   1074-1198      1.00x
+  response   1013-1186  0.94-0.99x
+
+С блоками в формате codec.dump_lines вырезать страницу почти ничего не
+стоит, и на работе воркера response_cache уже не выигрывает. Redis и ES
+здесь нет: в сервисе путь bytes при промахе локального кэша ещё и ходит
+в Redis за блоком, а попадание в response_cache — нет.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from api.v1.responses import CachedJSONResponse
+from core.config import settings
+from models.film import FilmShort, FilmsListResponse, FilmsQuery
+from services import codec
+from services.response_cache import ResponseCache
+
+REQUESTS = 5000
+CONCURRENCY = 50
+REPEAT = 3
+
+block = [
+    FilmShort(id=str(uuid.uuid4()), title=f"Film {i}", imdb_rating=round(i % 100 / 10, 1))
+    for i in range(settings.cache.block_size)
+]
+block_str = json.dumps([i.model_dump() for i in block])
+block_bytes = codec.dump_lines(block)
+responses = ResponseCache(max_size=100, ttl=60)
+
+app = FastAPI()
+
+
+@app.get("/models", response_model=FilmsListResponse)
+async def models_path(params: FilmsQuery = Depends()) -> List[FilmShort]:
+    return [FilmShort(**item) for item in json.loads(block_str)][:params.page_size]
+
+
+async def page_bytes(params: FilmsQuery) -> bytes:
+    return codec.join(codec.split_lines(block_bytes)[:params.page_size])
+
+
+@app.get("/bytes", response_model=FilmsListResponse)
+async def bytes_path(params: FilmsQuery = Depends()) -> CachedJSONResponse:
+    return CachedJSONResponse(await page_bytes(params))
+
+
+@app.get("/response", response_model=FilmsListResponse)
+async def response_path(params: FilmsQuery = Depends()) -> CachedJSONResponse:
+    key = responses.key("films_list", params)
+    return CachedJSONResponse(await responses.get(key, lambda: page_bytes(params)))
+
+
+async def rps(client: httpx.AsyncClient, path: str) -> float:
+    """Лучшее из REPEAT число запросов в секунду."""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one() -> None:
+        async with semaphore:
+            response = await client.get(path, params={"page_size": 50}, headers={"accept-encoding": "gzip"})
+            assert response.status_code == 200
+
+    best = 0.0
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(REQUESTS)))
+        best = max(best, REQUESTS / (time.perf_counter() - started))
+    return best
+
+
+async def main() -> None:
+    # logging сервиса пишет каждый запрос httpx в INFO — это мерили бы вместо ответа
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        bodies = [(await client.get(p, params={"page_size": 50})).json() for p in ("/models", "/bytes", "/response")]
+        assert bodies[0] == bodies[1] == bodies[2]
+
+        results = {path: await rps(client, path) for path in ("/models", "/bytes", "/response")}
+
+    base = results["/bytes"]
+    print(f"{'path':>10} {'req/s':>9} {'vs bytes':>9}")
+    for path, value in results.items():
+        print(f"{path.lstrip('/'):>10} {value:>9.0f} {value / base:>8.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
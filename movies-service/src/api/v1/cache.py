@@ -0,0 +1,33 @@
+import asyncio
+from http import HTTPStatus
+
+from fastapi import APIRouter, Depends
+
+from services.warmup import CacheWarmer, get_cache_warmer
+
+router = APIRouter()
+
+# ссылки на запущенные вручную прогревы, чтобы задачи не собрал GC
+_tasks: set[asyncio.Task] = set()
+
+
+@router.post(
+    "/warmup",
+    status_code=HTTPStatus.ACCEPTED,
+    summary="Запустить прогрев кэша",
+    description="Прогрев идёт в фоне; ход выполнения — в ответе GET /warmup и в метриках.",
+)
+async def start_warmup(warmer: CacheWarmer = Depends(get_cache_warmer)) -> dict:
+    if not warmer.running:
+        task = asyncio.create_task(warmer.run())
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    return warmer.stats()
+
+
+@router.get(
+    "/warmup",
+    summary="Состояние прогрева кэша",
+)
+async def warmup_status(warmer: CacheWarmer = Depends(get_cache_warmer)) -> dict:
+    return warmer.stats()
@@ -4,10 +4,16 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi import Security
 
-from services.film import FilmService, get_film_service
-from models.film import FilmDetail, FilmsQuery, FilmsListResponse, SearchQuery
+from core.deadline import DeadlineExceeded
+from services.film import FILM_CACHE_EXPIRE_IN_SECONDS, FilmService, get_film_service
+from services.response_cache import response_cache
+from models.film import (
+    FilmDetail, FilmsBatchRequest, FilmsBatchResponse, FilmsQuery, FilmsListResponse, FilmSuggestResponse,
+    SearchQuery, SuggestQuery,
+)
 from auth_service.dependencies import get_current_user
 from auth_service.http_client import UserPayload
+from api.v1.responses import CachedJSONResponse, cursor_headers
 
 
 # Объект router, в котором регистрируем обработчики
@@ -27,8 +33,40 @@ async def search_films(
     params: SearchQuery = Depends(),
     film_service: FilmService = Depends(get_film_service),
     user: UserPayload = Security(get_current_user),
-) -> FilmsListResponse:
-    return await film_service.search(params)
+) -> CachedJSONResponse:
+    if params.cursor is not None:
+        films, next_cursor = await film_service.search_cursor(params)
+        return CachedJSONResponse(films, headers=cursor_headers(next_cursor))
+    key = response_cache.key("films_search", params)
+    return CachedJSONResponse(await response_cache.get(key, lambda: film_service.search(params)))
+
+
+@router.get(
+    "/suggest",
+    response_model=FilmSuggestResponse,
+    summary="Автодополнение названий фильмов",
+    description="Несколько пар {id, title} по началу названия или любого его слова",
+)
+async def suggest_films(
+    params: SuggestQuery = Depends(),
+    film_service: FilmService = Depends(get_film_service),
+    user: UserPayload = Security(get_current_user),
+) -> CachedJSONResponse:
+    return CachedJSONResponse(await film_service.suggest(params))
+
+
+@router.post(
+    "/batch",
+    response_model=FilmsBatchResponse,
+    summary="Карточки нескольких фильмов",
+    description="Карточки в порядке запроса; для ненайденного id поле film равно null",
+)
+async def films_batch(
+    body: FilmsBatchRequest,
+    film_service: FilmService = Depends(get_film_service),
+    user: UserPayload = Security(get_current_user),
+) -> CachedJSONResponse:
+    return CachedJSONResponse(await film_service.get_many(body.ids))
 
 
 @router.get(
@@ -40,11 +78,11 @@ async def film_details(
     film_id: UUID,
     film_service: FilmService = Depends(get_film_service),
     user: UserPayload = Security(get_current_user),
-) -> FilmDetail:
+) -> CachedJSONResponse:
     film = await film_service.get_by_id(film_id)
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
-    return film
+    return CachedJSONResponse(film, max_age=FILM_CACHE_EXPIRE_IN_SECONDS)
 
 
 @router.get(
@@ -56,12 +94,18 @@ async def film_genre(
     params: FilmsQuery = Depends(),
     film_service: FilmService = Depends(get_film_service),
     user: UserPayload = Security(get_current_user),
-) -> FilmsListResponse:
+) -> CachedJSONResponse:
+    if params.cursor is not None:
+        films, next_cursor = await film_service.list_films_cursor(params)
+        return CachedJSONResponse(films, headers=cursor_headers(next_cursor))
     try:
-        films = await film_service.list_films(params)
+        key = response_cache.key("films_list", params)
+        films = await response_cache.get(key, lambda: film_service.list_films(params))
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"failed to fetch films, {e}",
         )
-    return films
+    return CachedJSONResponse(films)
@@ -2,10 +2,12 @@ from http import HTTPStatus
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
-from services.genre import GenreService, get_genre_service
+from services.genre import GENRE_CACHE_EXPIRE_IN_SECONDS, GenreService, get_genre_service
+from services.response_cache import response_cache
 from models.genre import GenresListResponse, Genre
 from auth_service.dependencies import get_current_user
 from auth_service.http_client import UserPayload
+from api.v1.responses import CachedJSONResponse
 
 
 router = APIRouter()
@@ -19,8 +21,10 @@ router = APIRouter()
 async def list_genres(
         genre_service: GenreService = Depends(get_genre_service),
         user: UserPayload = Depends(get_current_user),
-) -> GenresListResponse:
-    return await genre_service.list()
+) -> CachedJSONResponse:
+    key = response_cache.key("genres_list")
+    body = await response_cache.get(key, genre_service.list)
+    return CachedJSONResponse(body, max_age=GENRE_CACHE_EXPIRE_IN_SECONDS)
 
 
 @router.get(
@@ -32,8 +36,8 @@ async def genre_details(
     genre_id: UUID,
     genre_service: GenreService = Depends(get_genre_service),
     user: UserPayload = Depends(get_current_user),
-) -> Genre:
+) -> CachedJSONResponse:
     genre = await genre_service.get_by_id(genre_id)
     if not genre:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="genre not found")
-    return genre
\ No newline at end of file
+    return CachedJSONResponse(genre, max_age=GENRE_CACHE_EXPIRE_IN_SECONDS)
\ No newline at end of file
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from core import metrics
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    summary="Метрики процесса",
+    description="Снимок внутренних счётчиков инстанса (кэши, пулы соединений, circuit breaker).",
+)
+async def process_metrics() -> dict:
+    return metrics.collect()
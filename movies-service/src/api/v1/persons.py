@@ -4,11 +4,13 @@ from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
 
-from services.person import PersonService, get_person_service
-from models.person import PersonDetail, PersonFilm, PersonsSearchResponse
-from models.film import SearchQuery
+from services.person import PERSON_CACHE_EXPIRE_IN_SECONDS, PersonService, get_person_service
+from services.response_cache import response_cache
+from models.person import PersonDetail, PersonFilm, PersonsSearchResponse, PersonSuggestResponse
+from models.film import SearchQuery, SuggestQuery
 from auth_service.dependencies import get_current_user
 from auth_service.http_client import UserPayload
+from api.v1.responses import CachedJSONResponse, cursor_headers
 
 # Объект router, в котором регистрируем обработчики
 router = APIRouter()
@@ -22,8 +24,24 @@ async def search_persons(
     params: SearchQuery = Depends(),
     person_service: PersonService = Depends(get_person_service),
     user: UserPayload = Depends(get_current_user),
-):
-    return await person_service.search(params)
+) -> CachedJSONResponse:
+    if params.cursor is not None:
+        persons, next_cursor = await person_service.search_cursor(params)
+        return CachedJSONResponse(persons, headers=cursor_headers(next_cursor))
+    key = response_cache.key("persons_search", params)
+    return CachedJSONResponse(await response_cache.get(key, lambda: person_service.search(params)))
+
+@router.get(
+    "/suggest",
+    response_model=PersonSuggestResponse,
+    summary="Автодополнение имён персон",
+)
+async def suggest_persons(
+    params: SuggestQuery = Depends(),
+    person_service: PersonService = Depends(get_person_service),
+    user: UserPayload = Depends(get_current_user),
+) -> CachedJSONResponse:
+    return CachedJSONResponse(await person_service.suggest(params))
 
 @router.get(
     "/{person_id}",
@@ -34,11 +52,11 @@ async def person_details(
     person_id: UUID,
     person_service: PersonService = Depends(get_person_service),
     user: UserPayload = Depends(get_current_user),
-) -> PersonDetail:
+) -> CachedJSONResponse:
     person = await person_service.get_by_id(person_id)
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
-    return person
+    return CachedJSONResponse(person, max_age=PERSON_CACHE_EXPIRE_IN_SECONDS)
 
 @router.get(
     "/{person_id}/film",
@@ -50,6 +68,7 @@ async def person_films(
     person_id: UUID,
     person_service: PersonService = Depends(get_person_service),
     user: UserPayload = Depends(get_current_user),
-) -> list[PersonFilm]:
-    films = await person_service.get_person_films(str(person_id))
-    return films
+) -> CachedJSONResponse:
+    key = response_cache.key("person_films", str(person_id))
+    films = await response_cache.get(key, lambda: person_service.get_person_films(str(person_id)))
+    return CachedJSONResponse(films)
@@ -0,0 +1,93 @@
+import hashlib
+
+from fastapi.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from services import codec
+from services.cursor import NEXT_CURSOR_HEADER
+
+
+def accepts_gzip(scope: Scope) -> bool:
+    """Разрешает ли Accept-Encoding клиента ответ в gzip."""
+    for name, value in scope.get("headers", []):
+        if name != b"accept-encoding":
+            continue
+        for part in value.decode("latin-1").split(","):
+            coding, _, params = part.partition(";")
+            if coding.strip().lower() in ("gzip", "*"):
+                q = params.strip().removeprefix("q=")
+                try:
+                    return not params or float(q) > 0
+                except ValueError:
+                    return True
+    return False
+
+
+def etag_for(body: bytes) -> str:
+    """Сильный ETag по байтам ответа: у gzip- и несжатого представления он разный."""
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def etag_matches(scope: Scope, etag: str) -> bool:
+    """Совпадает ли If-None-Match с etag (слабое сравнение, как требует RFC 9110)."""
+    for name, value in scope.get("headers", []):
+        if name != b"if-none-match":
+            continue
+        tags = value.decode("latin-1")
+        if tags.strip() == "*":
+            return True
+        # nginx, сжимая ответ, ослабляет ETag до W/"..."
+        return any(tag.strip().removeprefix("W/") == etag for tag in tags.split(","))
+    return False
+
+
+class CachedJSONResponse(Response):
+    """Ответ из готовых JSON-байтов (значение кэша, services.codec).
+
+    FastAPI не сериализует и не валидирует такой ответ повторно;
+    response_model у ручек остаётся для документации OpenAPI.
+    Сжатое значение уходит как есть с Content-Encoding: gzip, а клиенту
+    без gzip в Accept-Encoding распаковывается перед отправкой.
+
+    С max_age ответ получает ETag по отправляемым байтам и Cache-Control;
+    на совпавший If-None-Match отвечаем 304 без тела. Ручки требуют токен,
+    поэтому кэш только private — общий кэш (nginx) отдал бы ответ без проверки.
+    """
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: bytes,
+        status_code: int = 200,
+        headers: dict | None = None,
+        max_age: int | None = None,
+    ):
+        super().__init__(content, status_code=status_code, headers=headers)
+        self.max_age = max_age
+        self.headers["vary"] = "Accept-Encoding"
+        if codec.is_compressed(self.body):
+            self.headers["content-encoding"] = "gzip"
+        if max_age is not None:
+            self.headers["cache-control"] = f"private, max-age={max_age}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if codec.is_compressed(self.body) and not accepts_gzip(scope):
+            self.body = codec.decompress(self.body)
+            del self.headers["content-encoding"]
+            self.headers["content-length"] = str(len(self.body))
+        if self.max_age is not None:
+            etag = etag_for(self.body)
+            self.headers["etag"] = etag
+            if etag_matches(scope, etag):
+                not_modified = Response(
+                    status_code=304,
+                    headers={name: self.headers[name] for name in ("etag", "cache-control", "vary")},
+                )
+                await not_modified(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
+
+
+def cursor_headers(next_cursor: str | None) -> dict | None:
+    """Заголовок с курсором следующей страницы; на последней странице его нет."""
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
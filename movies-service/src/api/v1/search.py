@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+
+from services.search import SearchService, get_search_service
+from services.response_cache import response_cache
+from models.search import SearchResponse, UnifiedSearchQuery
+from auth_service.dependencies import get_current_user
+from auth_service.http_client import UserPayload
+from api.v1.responses import CachedJSONResponse
+
+router = APIRouter()
+
+
+@router.get(
+    # без завершающего слэша: /api/v1/search?query=...
+    "",
+    response_model=SearchResponse,
+    summary="Поиск по фильмам и персонам",
+    description="Первые size фильмов и персон по запросу; фильмы и персоны ищутся одним запросом в ES",
+)
+async def search(
+    params: UnifiedSearchQuery = Depends(),
+    search_service: SearchService = Depends(get_search_service),
+    user: UserPayload = Depends(get_current_user),
+) -> CachedJSONResponse:
+    key = response_cache.key("search", params)
+    return CachedJSONResponse(await response_cache.get(key, lambda: search_service.search(params)))
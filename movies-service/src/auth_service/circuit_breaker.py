@@ -0,0 +1,66 @@
+import time
+from enum import Enum
+
+
+class CircuitState(str, Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitBreaker:
+    """Простой circuit breaker для вызовов внешнего сервиса.
+
+    closed    — запросы идут как обычно, считаем подряд идущие ошибки;
+    open      — после failure_threshold ошибок запросы сразу отклоняются;
+    half_open — через reset_timeout секунд пропускаем один пробный запрос:
+                успех закрывает цепь, ошибка снова её открывает.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._state = CircuitState.closed
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.open and time.monotonic() - self._opened_at >= self._reset_timeout:
+            self._state = CircuitState.half_open
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CircuitState.closed:
+            return True
+        if state == CircuitState.half_open and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self._state = CircuitState.closed
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if self._state == CircuitState.half_open or self._failures >= self._failure_threshold:
+            self._state = CircuitState.open
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Снять пробный запрос без результата (например, если его отменили)."""
+        self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self._failures,
+            "rejected": self.rejected,
+        }
@@ -1,9 +1,11 @@
-from fastapi import Security, HTTPException, status
+from fastapi import Depends, Security, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-from auth_service.http_client import AuthServiceClient
+from auth_service.http_client import AuthServiceClient, UserPayload
+from core import metrics
 
 auth_client = AuthServiceClient()
+metrics.register("auth", auth_client.stats)
 auth_scheme = HTTPBearer()
 
 
@@ -16,3 +18,12 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Security(
             detail="Missing Authorization header",
         )
     return await auth_client.verify_token(token)
+
+
+def require_roles(*needed: str):
+    """Пропускает только пользователей хотя бы с одной из ролей — как require_roles в auth-service."""
+    async def dep(user: UserPayload = Depends(get_current_user)) -> UserPayload:
+        if set(user.roles or []).isdisjoint(needed):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+        return user
+    return dep
@@ -1,10 +1,17 @@
+import asyncio
+
 import httpx
 from fastapi import HTTPException, status
 from pydantic import BaseModel
-from core.config import Settings
-
 
-settings = Settings()
+from auth_service import pool
+from auth_service.circuit_breaker import CircuitBreaker
+from auth_service.jwks import JWKSClient
+from auth_service.jwt_verifier import LocalTokenVerifier
+from auth_service.revocation import RevocationList
+from auth_service.token_cache import TokenCache
+from core.config import settings, AuthVerifyMode
+from core.singleflight import SingleFlight
 
 
 class UserPayload(BaseModel):
@@ -14,26 +21,111 @@ class UserPayload(BaseModel):
 
 
 class AuthServiceClient:
-    """HTTP клиент для обращения к auth-service."""
+    """Клиент проверки токенов auth-service.
+
+    В режиме local токен проверяется внутри процесса, в режиме remote —
+    HTTP-запросом в auth-service. Режим задаётся AUTH_VERIFY_MODE.
+    Успешно проверенные токены кэшируются в памяти процесса, а одновременные
+    проверки одного и того же токена схлопываются в одну. Отозванные токены
+    (logout, смена пароля) отсекаются по ленте отзывов и при попадании в кэш.
+    Запросы в auth-service идут через общий пул соединений (auth_service.pool)
+    и circuit breaker: при недоступном auth-service сразу отвечаем 503.
+    """
 
     def __init__(self):
-        # Используем URL авторизационного сервиса из .env
-        self.base_url = settings.auth_service_url.rstrip("/")
+        self.mode = settings.auth.verify_mode
+        self._local: LocalTokenVerifier | None = None
+        if self.mode == AuthVerifyMode.local:
+            self._local = LocalTokenVerifier(
+                secret=settings.auth.jwt_secret,
+                algorithm=settings.auth.jwt_algorithm,
+                issuer=settings.auth.jwt_issuer,
+                audience=settings.auth.jwt_audience,
+                jwks=JWKSClient(
+                    path=settings.auth.jwks_path,
+                    min_refresh_sec=settings.auth.jwks_min_refresh_sec,
+                ) if settings.auth.asymmetric else None,
+            )
+        self.cache = TokenCache(
+            max_size=settings.auth.token_cache_size,
+            ttl_cap=settings.auth.token_cache_ttl_sec,
+        )
+        self.revocations = RevocationList(
+            stream=settings.auth.revocation_stream,
+            horizon_sec=settings.auth.revocation_horizon_sec,
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.auth.breaker_failure_threshold,
+            reset_timeout=settings.auth.breaker_reset_timeout_sec,
+        )
+        self.in_flight = 0
+        self._verifications = SingleFlight()
+
+    async def verify_token(self, token: str) -> UserPayload:
+        if (claims := self.cache.get(token)) is None:
+            claims = await self._verifications.do(
+                TokenCache.key(token), lambda: self._verify_and_cache(token)
+            )
+        if self.revocations.is_revoked(claims):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revoked",
+            )
+        return UserPayload(**claims)
+
+    async def _verify_and_cache(self, token: str) -> dict:
+        if self._local is not None:
+            claims = await self._local.verify(token)
+        else:
+            claims = await self._verify_remote(token)
+        self.cache.set(token, claims)
+        return claims
 
-    async def verify_token(self, token: str):
+    async def _verify_remote(self, token: str) -> dict:
         """Проверка токена через эндпойнт /auth/verify."""
+        if not self.breaker.allow():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Auth service unavailable: circuit open",
+            )
+
         headers = {"Authorization": f"Bearer {token}"}
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{self.base_url}/auth/verify", headers=headers)
-            except httpx.RequestError as e:
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail=f"Auth service unavailable: {e}",
-                )
-            if response.status_code == 200:
-                return response.json()
+        self.in_flight += 1
+        try:
+            response = await pool.client.get("/auth/verify", headers=headers)
+        except httpx.RequestError as e:
+            self.breaker.record_failure()
             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid or expired token",
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Auth service unavailable: {e}",
             )
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        finally:
+            self.in_flight -= 1
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Auth service unavailable: HTTP {response.status_code}",
+            )
+        self.breaker.record_success()
+
+        if response.status_code == 200:
+            return response.json().get("claims", {})
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+        )
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode.value,
+            "token_cache": self.cache.stats(),
+            "coalescing": self._verifications.stats(),
+            "revocations": self.revocations.stats(),
+            "breaker": self.breaker.stats(),
+            "pool": {**pool.pool_stats(), "in_flight": self.in_flight},
+        }
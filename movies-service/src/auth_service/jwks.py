@@ -0,0 +1,43 @@
+import time
+
+import httpx
+from fastapi import HTTPException, status
+
+from auth_service import pool
+from core.singleflight import SingleFlight
+
+
+class JWKSClient:
+    """Кэш публичных ключей auth-service (/.well-known/jwks.json).
+
+    Набор ключей скачивается один раз и перечитывается только когда встречается
+    незнакомый kid (не чаще раза в min_refresh_sec) — дальше токены
+    проверяются офлайн.
+    """
+
+    def __init__(self, path: str, min_refresh_sec: float):
+        self._path = path
+        self._min_refresh_sec = min_refresh_sec
+        self._keys: dict[str, dict] = {}
+        self._fetched_at: float | None = None
+        self._fetches = SingleFlight()
+
+    async def get_key(self, kid: str | None) -> dict | None:
+        if kid in self._keys:
+            return self._keys[kid]
+        if self._fetched_at is None or time.monotonic() - self._fetched_at >= self._min_refresh_sec:
+            await self._fetches.do("jwks", self._refresh)
+        return self._keys.get(kid)
+
+    async def _refresh(self) -> None:
+        try:
+            response = await pool.client.get(self._path)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Auth service keys unavailable: {e}",
+            )
+        keys = response.json().get("keys", [])
+        self._keys = {k["kid"]: k for k in keys if k.get("kid")}
+        self._fetched_at = time.monotonic()
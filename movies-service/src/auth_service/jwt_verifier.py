@@ -0,0 +1,65 @@
+from fastapi import HTTPException, status
+from jose import jwt, JWTError
+from jose.exceptions import ExpiredSignatureError
+
+from auth_service.jwks import JWKSClient
+
+
+class LocalTokenVerifier:
+    """Проверка access-токена внутри процесса, без похода в auth-service.
+
+    Проверяются те же claims, что выпускает auth-service
+    (src/core/jwt.create_access_token): подпись, exp, iss и aud.
+    Для HS256 подпись проверяется общим секретом, для RS256/ES256 —
+    публичным ключом из JWKS по kid из заголовка токена.
+    """
+
+    def __init__(
+        self,
+        secret: str | None,
+        algorithm: str,
+        issuer: str,
+        audience: str,
+        jwks: JWKSClient | None = None,
+    ):
+        if jwks is None and not secret:
+            raise ValueError("JWT_SECRET is required for AUTH_VERIFY_MODE=local")
+        self._secret = secret
+        self._jwks = jwks
+        self._algorithm = algorithm
+        self._issuer = issuer
+        self._audience = audience
+
+    async def verify(self, token: str) -> dict:
+        try:
+            key = self._secret
+            if self._jwks is not None:
+                key = await self._jwks.get_key(jwt.get_unverified_header(token).get("kid"))
+                if key is None:
+                    raise JWTError("Unknown signing key")
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[self._algorithm],
+                audience=self._audience,
+                issuer=self._issuer,
+                options={"require_exp": True, "require_iss": True, "require_aud": True},
+            )
+        except ExpiredSignatureError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Access token expired",
+            )
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token",
+            )
+
+        # refresh-токен подписан тем же ключом и с теми же iss/aud — не пускаем его как access
+        if claims.get("typ") == "refresh":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token",
+            )
+        return claims
@@ -0,0 +1,37 @@
+from typing import Optional
+
+import httpx
+
+from core.config import settings
+
+client: Optional[httpx.AsyncClient] = None
+
+
+def create_client() -> httpx.AsyncClient:
+    """Общий HTTP-клиент к auth-service: keep-alive, лимиты соединений и строгие таймауты."""
+    return httpx.AsyncClient(
+        base_url=settings.auth.service_url.rstrip("/"),
+        limits=httpx.Limits(
+            max_connections=settings.auth.http_max_connections,
+            max_keepalive_connections=settings.auth.http_max_keepalive,
+            keepalive_expiry=settings.auth.http_keepalive_expiry_sec,
+        ),
+        timeout=httpx.Timeout(
+            settings.auth.http_timeout_sec,
+            connect=settings.auth.http_connect_timeout_sec,
+        ),
+    )
+
+
+def pool_stats() -> dict:
+    # httpx не отдаёт статистику пула публично — смотрим в пул httpcore под транспортом;
+    # это не API: если внутренности сменятся, статистика будет нулевой, а не ошибкой
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", None) or [])
+    idle = sum(1 for conn in connections if getattr(conn, "is_idle", lambda: False)())
+    return {
+        "connections": len(connections),
+        "active": len(connections) - idle,
+        "idle": idle,
+        "max_connections": settings.auth.http_max_connections,
+    }
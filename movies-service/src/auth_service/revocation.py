@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import time
+
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """Отозванные access-токены в памяти процесса.
+
+    Наполняется из Redis Stream, который ведёт auth-service: отдельные jti
+    (logout) и метки «все токены пользователя до момента before» (смена пароля).
+    Проверка — два поиска в dict, поэтому её можно делать на каждый запрос,
+    в том числе при попадании в кэш проверенных токенов.
+    """
+
+    def __init__(self, stream: str, horizon_sec: int):
+        self._stream = stream
+        # дольше максимального срока жизни access-токена запись хранить незачем
+        self._horizon_sec = horizon_sec
+        self._jti: dict[str, float] = {}
+        self._users: dict[str, float] = {}
+        self._last_id = f"{int((time.time() - horizon_sec) * 1000)}-0"
+
+    def is_revoked(self, claims: dict) -> bool:
+        if claims.get("jti") in self._jti:
+            return True
+        before = self._users.get(claims.get("sub"))
+        return before is not None and claims.get("iat", 0) < before
+
+    def apply(self, entry: dict) -> None:
+        kind = entry.get("type")
+        if kind == "jti" and entry.get("jti"):
+            self._jti[entry["jti"]] = float(entry.get("exp") or time.time() + self._horizon_sec)
+        elif kind == "user" and entry.get("sub"):
+            before = float(entry.get("before") or 0)
+            self._users[entry["sub"]] = max(before, self._users.get(entry["sub"], 0))
+
+    def prune(self) -> None:
+        now = time.time()
+        self._jti = {jti: exp for jti, exp in self._jti.items() if exp > now}
+        self._users = {
+            sub: before for sub, before in self._users.items() if before + self._horizon_sec > now
+        }
+
+    async def run(self, r: Redis) -> None:
+        """Читает ленту отзывов; при старте догоняет записи за последние horizon_sec."""
+        while True:
+            try:
+                response = await r.xread({self._stream: self._last_id}, count=1000, block=5000)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Не удалось прочитать ленту отзывов токенов: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    self.apply({_decode(k): _decode(v) for k, v in fields.items()})
+                    self._last_id = _decode(entry_id)
+            self.prune()
+
+    def stats(self) -> dict:
+        return {"jti": len(self._jti), "users": len(self._users)}
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, (bytes, bytearray)) else value
@@ -0,0 +1,65 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class TokenCache:
+    """LRU уже проверенных access-токенов.
+
+    Ключ — sha256 токена (сам токен в памяти не храним), значение — claims.
+    Запись живёт до exp токена или до ttl_cap секунд, смотря что наступит раньше.
+    """
+
+    def __init__(self, max_size: int, ttl_cap: int):
+        self._max_size = max_size
+        self._ttl_cap = ttl_cap
+        self._items: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self.key(token)
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, claims = item
+        if expires_at <= time.time():
+            del self._items[key]
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def set(self, token: str, claims: dict) -> None:
+        if self._max_size <= 0:
+            return
+
+        now = time.time()
+        expires_at = now + self._ttl_cap
+        if exp := claims.get("exp"):
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= now:
+            return
+
+        key = self.key(token)
+        self._items[key] = (expires_at, claims)
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._items),
+            "max_size": self._max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,12 +1,14 @@
 import os
 import logging
 from enum import Enum
+from typing import List
 from logging import config as logging_config
 
-from pydantic import Field
+from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from core.logger import LOGGING
+from models.film import MAX_PAGE_SIZE, MAX_WINDOW
 
 
 class Resource(str, Enum):
@@ -15,6 +17,11 @@ class Resource(str, Enum):
     persons = "persons"
 
 
+class AuthVerifyMode(str, Enum):
+    local = "local"
+    remote = "remote"
+
+
 class ElasticsearchSettings(BaseSettings):
     host: str = Field(..., validation_alias="ELASTIC_HOST")
     port: int = Field(..., validation_alias="ELASTIC_PORT")
@@ -24,6 +31,24 @@ class ElasticsearchSettings(BaseSettings):
     genres_index: str = Field(..., validation_alias="ES_GENRES_INDEX")
     persons_index: str = Field(..., validation_alias="ES_PERSONS_INDEX")
 
+    # таймаут одного HTTP-запроса клиента ES и повторы при сетевых ошибках и таймаутах
+    request_timeout_sec: float = Field(5.0, validation_alias="ES_REQUEST_TIMEOUT_SEC")
+    max_retries: int = Field(2, validation_alias="ES_MAX_RETRIES")
+    # бюджет времени HTTP-запроса к сервису (клиент может сократить его заголовком X-Request-Timeout-Ms)
+    deadline_ms: int = Field(3000, validation_alias="ES_DEADLINE_MS")
+    # дубль чтения на другую копию шарда, если ответа нет дольше p95 (но не меньше min_delay)
+    hedge_enabled: bool = Field(True, validation_alias="ES_HEDGE_ENABLED")
+    hedge_min_delay_ms: float = Field(20.0, validation_alias="ES_HEDGE_MIN_DELAY_MS")
+
+    # микробатчинг запросов фильмов в _msearch/_mget (services.batching)
+    batch_enabled: bool = Field(False, validation_alias="ES_BATCH_ENABLED")
+    batch_window_ms: float = Field(2.0, validation_alias="ES_BATCH_WINDOW_MS")
+    batch_max_size: int = Field(50, validation_alias="ES_BATCH_MAX_SIZE")
+
+    # point in time курсорной пагинации: сколько живёт между страницами и сколько открыто на инстанс
+    pit_keep_alive_sec: int = Field(60, validation_alias="ES_PIT_KEEP_ALIVE_SEC")
+    pit_max_open: int = Field(200, validation_alias="ES_PIT_MAX_OPEN")
+
     def index_for(self, resource: Resource) -> str:
         mapping = {
             Resource.films: self.films_index,
@@ -39,6 +64,85 @@ class RedisSettings(BaseSettings):
     port: int = Field(..., validation_alias='REDIS_PORT')
 
 
+class AuthSettings(BaseSettings):
+    """Настройки проверки access-токенов auth-service.
+
+    local  — подпись, exp, iss и aud проверяются внутри процесса;
+    remote — каждый токен проверяется запросом в auth-service (/auth/verify).
+    """
+    service_url: str = Field(..., validation_alias='AUTH_SERVICE_URL')
+    verify_mode: AuthVerifyMode = Field(AuthVerifyMode.local, validation_alias='AUTH_VERIFY_MODE')
+    jwt_secret: str | None = Field(None, validation_alias='JWT_SECRET')
+    jwt_algorithm: str = Field('HS256', validation_alias='JWT_ALGORITHM')
+    jwt_issuer: str = Field('auth-service', validation_alias='JWT_ISS')
+    jwt_audience: str = Field('movies-service', validation_alias='JWT_AUD')
+    # для RS256/ES256 ключи берутся из JWKS auth-service, JWT_SECRET не нужен
+    jwks_path: str = Field('/.well-known/jwks.json', validation_alias='AUTH_JWKS_PATH')
+    jwks_min_refresh_sec: float = Field(10.0, validation_alias='AUTH_JWKS_MIN_REFRESH_SEC')
+    token_cache_size: int = Field(10000, validation_alias='AUTH_TOKEN_CACHE_SIZE')
+    token_cache_ttl_sec: int = Field(60, validation_alias='AUTH_TOKEN_CACHE_TTL_SEC')
+
+    http_max_connections: int = Field(100, validation_alias='AUTH_HTTP_MAX_CONNECTIONS')
+    http_max_keepalive: int = Field(20, validation_alias='AUTH_HTTP_MAX_KEEPALIVE')
+    http_keepalive_expiry_sec: float = Field(30.0, validation_alias='AUTH_HTTP_KEEPALIVE_EXPIRY_SEC')
+    http_timeout_sec: float = Field(1.0, validation_alias='AUTH_HTTP_TIMEOUT_SEC')
+    http_connect_timeout_sec: float = Field(0.5, validation_alias='AUTH_HTTP_CONNECT_TIMEOUT_SEC')
+
+    breaker_failure_threshold: int = Field(5, validation_alias='AUTH_BREAKER_FAILURE_THRESHOLD')
+    breaker_reset_timeout_sec: float = Field(10.0, validation_alias='AUTH_BREAKER_RESET_TIMEOUT_SEC')
+
+    # лента отзывов токенов; горизонт — не меньше срока жизни access-токена
+    revocation_stream: str = Field('auth:revocations', validation_alias='AUTH_REVOCATION_STREAM')
+    revocation_horizon_sec: int = Field(960, validation_alias='AUTH_REVOCATION_HORIZON_SEC')
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.jwt_algorithm in ('RS256', 'ES256')
+
+
+class CacheSettings(BaseSettings):
+    """Настройки кэша: локальный LRU процесса перед Redis."""
+    local_max_size: int = Field(10000, validation_alias='CACHE_LOCAL_MAX_SIZE')
+    local_ttl_sec: int = Field(30, validation_alias='CACHE_LOCAL_TTL_SEC')
+    invalidation_channel: str = Field('cache:invalidate', validation_alias='CACHE_INVALIDATION_CHANNEL')
+    # списки и поиск: после мягкого TTL отдаём старое значение ещё stale_grace_sec, обновляя его в фоне
+    stale_grace_sec: int = Field(600, validation_alias='CACHE_STALE_GRACE_SEC')
+    lease_ms: int = Field(5000, validation_alias='CACHE_LEASE_MS')
+    # поток событий ETL о переиндексированных документах и группа потребителей сервиса
+    events_stream: str = Field('etl:indexed', validation_alias='CACHE_EVENTS_STREAM')
+    events_group: str = Field('movies-service', validation_alias='CACHE_EVENTS_GROUP')
+    events_claim_idle_ms: int = Field(60000, validation_alias='CACHE_EVENTS_CLAIM_IDLE_MS')
+    # значения больше порога хранятся в gzip и отдаются клиенту без распаковки
+    compress_min_bytes: int = Field(1024, validation_alias='CACHE_COMPRESS_MIN_BYTES')
+    compress_level: int = Field(6, validation_alias='CACHE_COMPRESS_LEVEL')
+    # списки и поиск кэшируются блоками фиксированного размера, страницы вырезаются из них;
+    # размер должен делить окно ES (MAX_WINDOW), иначе последний блок окна в него не влезет
+    block_size: int = Field(100, validation_alias='CACHE_BLOCK_SIZE')
+    # сколько помнить, что id нет в индексе
+    negative_ttl_sec: int = Field(30, validation_alias='CACHE_NEGATIVE_TTL_SEC')
+    # подсказки автодополнения по префиксу
+    suggest_ttl_sec: int = Field(60, validation_alias='CACHE_SUGGEST_TTL_SEC')
+    # списки по -imdb_rating из sorted set-ов, которые ведёт ETL (ETL_RANKINGS_PREFIX)
+    rankings_enabled: bool = Field(True, validation_alias='CACHE_RANKINGS_ENABLED')
+    rankings_prefix: str = Field('films:rank', validation_alias='CACHE_RANKINGS_PREFIX')
+    # готовые тела ответов GET-ручек в памяти процесса; 0 в max_size — выключено
+    response_max_size: int = Field(2000, validation_alias='CACHE_RESPONSE_MAX_SIZE')
+    response_ttl_sec: int = Field(5, validation_alias='CACHE_RESPONSE_TTL_SEC')
+    # прогрев при старте: жанры, первые страницы списков по жанрам и сортировкам, топ карточек
+    warmup_enabled: bool = Field(True, validation_alias='CACHE_WARMUP_ENABLED')
+    warmup_pages: int = Field(3, validation_alias='CACHE_WARMUP_PAGES')
+    warmup_sorts: List[str] = Field(['-imdb_rating'], validation_alias='CACHE_WARMUP_SORTS')
+    warmup_top_films: int = Field(100, ge=0, le=MAX_PAGE_SIZE, validation_alias='CACHE_WARMUP_TOP_FILMS')
+    warmup_concurrency: int = Field(4, validation_alias='CACHE_WARMUP_CONCURRENCY')
+
+    @field_validator('block_size')
+    @classmethod
+    def check_block_size(cls, v: int) -> int:
+        if v <= 0 or MAX_WINDOW % v:
+            raise ValueError(f'CACHE_BLOCK_SIZE must be a positive divisor of {MAX_WINDOW}')
+        return v
+
+
 class ProjectSettings(BaseSettings):
     """Текстовая информация о проекте"""
     name: str = Field(..., validation_alias='PROJECT_NAME')
@@ -54,6 +158,8 @@ class AppSettings(BaseSettings):
     redis: RedisSettings = Field(default_factory=RedisSettings)
     es: ElasticsearchSettings = Field(default_factory=ElasticsearchSettings)
     pr: ProjectSettings = Field(default_factory=ProjectSettings)
+    auth: AuthSettings = Field(default_factory=AuthSettings)
+    cache: CacheSettings = Field(default_factory=CacheSettings)
 
 
 class Settings(BaseSettings):
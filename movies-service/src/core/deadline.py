@@ -0,0 +1,73 @@
+"""Дедлайн текущего HTTP-запроса.
+
+Задаётся middleware в main.py и доступен любой корутине запроса через
+contextvar: чтения из Elasticsearch ограничивают им своё ожидание.
+Фоновые задачи наследуют контекст запроса, поэтому сбрасывают дедлайн
+через clear(). Общий вызов нескольких запросов (core.singleflight)
+живёт под Shared — самым поздним из их дедлайнов.
+"""
+import time
+from contextvars import ContextVar
+from typing import Optional, Union
+
+
+class Shared:
+    """Дедлайн общего вызова: самый поздний из дедлайнов его ожидающих.
+
+    Ожидающие присоединяются и уходят, пока вызов идёт, поэтому дедлайн
+    вычисляется при каждом обращении. Если хоть у одного ожидающего
+    дедлайна нет, его нет и у вызова.
+    """
+
+    def __init__(self):
+        self._waiters: list[Union[float, "Shared", None]] = []
+
+    def join(self, waiter: Union[float, "Shared", None]) -> None:
+        self._waiters.append(waiter)
+
+    def leave(self, waiter: Union[float, "Shared", None]) -> None:
+        self._waiters.remove(waiter)
+
+    @property
+    def empty(self) -> bool:
+        return not self._waiters
+
+    def at(self) -> Optional[float]:
+        deadlines = [_resolve(waiter) for waiter in self._waiters]
+        if not deadlines or None in deadlines:
+            return None
+        return max(deadlines)
+
+
+_deadline: ContextVar[Union[float, Shared, None]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Бюджет времени запроса исчерпан."""
+
+
+def set_timeout(seconds: float) -> None:
+    _deadline.set(time.monotonic() + seconds)
+
+
+def clear() -> None:
+    _deadline.set(None)
+
+
+def current() -> Union[float, Shared, None]:
+    """Дедлайн контекста как есть — им присоединяются к общему вызову."""
+    return _deadline.get()
+
+
+def share(shared: Shared) -> None:
+    _deadline.set(shared)
+
+
+def remaining() -> Optional[float]:
+    """Сколько секунд осталось до дедлайна; None — дедлайна нет."""
+    deadline = _resolve(_deadline.get())
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _resolve(value: Union[float, Shared, None]) -> Optional[float]:
+    return value.at() if isinstance(value, Shared) else value
@@ -0,0 +1,12 @@
+from typing import Callable, Dict
+
+# Источники метрик процесса: имя -> функция, возвращающая снимок в виде dict
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, collector: Callable[[], dict]) -> None:
+    _collectors[name] = collector
+
+
+def collect() -> Dict[str, dict]:
+    return {name: collector() for name, collector in _collectors.items()}
@@ -0,0 +1,90 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from core import deadline
+from core.deadline import DeadlineExceeded
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Схлопывание одновременных одинаковых вызовов.
+
+    Пока вызов по ключу выполняется, остальные вызовы с тем же ключом
+    ждут его результат (или его исключение), а не запускают свой.
+    Вызов идёт в отдельной задаче, поэтому отмена одного из ожидающих
+    не отменяет его для остальных.
+
+    Общий вызов живёт под самым поздним из дедлайнов ожидающих
+    (deadline.Shared): короткий X-Request-Timeout-Ms первого запроса не
+    роняет тех, кто к нему присоединился, а запросы в ES всё равно
+    ограничены дедлайном. Каждый ожидающий ждёт не дольше своего
+    дедлайна; когда не осталось ни одного, вызов отменяется.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Tuple[asyncio.Future, deadline.Shared]] = {}
+        self.shared = 0
+        self.abandoned = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            shared = deadline.Shared()
+            future = asyncio.ensure_future(self._run(shared, fn))
+            call = self._calls[key] = (future, shared)
+            future.add_done_callback(lambda f: self._forget(key, f))
+        else:
+            self.shared += 1
+        future, shared = call
+
+        waiter = deadline.current()
+        shared.join(waiter)
+        try:
+            return await self._wait(key, future)
+        except DeadlineExceeded:
+            left = deadline.remaining()
+            if not future.done() or (left is not None and left <= 0):
+                raise
+            # вызов начался под более коротким дедлайном тех, кто пришёл раньше, —
+            # у этого запроса время ещё есть, повторяем под его дедлайном
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            return await self.do(key, fn)
+        finally:
+            shared.leave(waiter)
+            if shared.empty and not future.done():
+                # все ожидающие ушли по дедлайну или отмене — результат никому не нужен
+                future.cancel()
+                self.abandoned += 1
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+    @staticmethod
+    async def _wait(key: Hashable, future: asyncio.Future) -> T:
+        while True:
+            budget = deadline.remaining()
+            # asyncio.wait, в отличие от await future, не отменяет future при отмене ожидающего
+            done, _ = await asyncio.wait({future}, timeout=None if budget is None else max(budget, 0))
+            if done:
+                return future.result()
+            # дедлайн самого ожидающего мог отодвинуться (он сам общий вызов уровнем выше)
+            if (budget := deadline.remaining()) is not None and budget <= 0:
+                raise DeadlineExceeded(f"shared call for {key!r} did not finish before the request deadline")
+
+    @staticmethod
+    async def _run(shared: deadline.Shared, fn: Callable[[], Awaitable[T]]) -> T:
+        # задача унаследовала контекст первого запроса — меняем его дедлайн на общий
+        deadline.share(shared)
+        return await fn()
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        call = self._calls.get(key)
+        if call is not None and call[0] is future:
+            del self._calls[key]
+        # если все ожидающие успели отмениться, исключение никто не заберёт — забираем сами
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "shared": self.shared, "abandoned": self.abandoned}
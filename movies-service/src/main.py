@@ -1,14 +1,26 @@
+import asyncio
+
 from elasticsearch import AsyncElasticsearch
-from fastapi import FastAPI, Request, status
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.responses import ORJSONResponse, JSONResponse
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from redis.asyncio import Redis
 from contextlib import asynccontextmanager
 
-from api.v1 import films, persons, genres
-from core.config import settings
+from api.v1 import films, persons, genres, search, metrics, cache
+from auth_service import pool
+from auth_service.dependencies import auth_client, require_roles
+from core import deadline
+from core.config import settings, Resource
+from core.deadline import DeadlineExceeded
 from core.jaeger import configure_tracer, jaeger_settings
 from db import elastic, redis
+from services.cache import get_cache, get_cache_tags, listen_invalidations, local_cache
+from services.cursor import InvalidCursor, TooManyCursors
+from services.hedging import hedged_reads
+from services.invalidation import create_consumer
+from services.rankings import get_film_rankings
+from services.warmup import get_cache_warmer
 
 from pydantic import ValidationError
 
@@ -18,10 +30,43 @@ from pydantic import ValidationError
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     redis.redis = Redis(host=settings.redis.host, port=settings.redis.port)
-    elastic.es = AsyncElasticsearch(hosts=[f'{settings.es.protocol}://{settings.es.host}:{settings.es.port}'])
+    elastic.es = AsyncElasticsearch(
+        hosts=[f'{settings.es.protocol}://{settings.es.host}:{settings.es.port}'],
+        request_timeout=settings.es.request_timeout_sec,
+        max_retries=settings.es.max_retries,
+        retry_on_timeout=True,
+    )
+    pool.client = pool.create_client()
+    revocations_task = asyncio.create_task(auth_client.revocations.run(redis.redis))
+    invalidations_task = asyncio.create_task(listen_invalidations(redis.redis, local_cache))
+    index_events = create_consumer(get_cache(redis=redis.redis), get_cache_tags(redis=redis.redis))
+    index_events_task = asyncio.create_task(index_events.run(redis.redis))
+    # узлы ES, между которыми хеджированные чтения разводят запрос и дубль
+    es_nodes_task = asyncio.create_task(hedged_reads.watch_nodes(elastic.es))
+    # uuid индекса фильмов: рейтинги из Redis читаются, только если собраны из него
+    rankings_task = None
+    if settings.cache.rankings_enabled:
+        rankings = get_film_rankings(redis=redis.redis)
+        films_index = settings.es.index_for(Resource.films)
+        rankings_task = asyncio.create_task(rankings.watch_index(elastic.es, films_index))
+    # прогрев в фоне: инстанс принимает запросы сразу, не дожидаясь его окончания
+    warmer = get_cache_warmer(redis=redis.redis, elastic=elastic.es)
+    warmup_task = asyncio.create_task(warmer.run()) if settings.cache.warmup_enabled else None
     yield
+    if warmup_task:
+        # дожидаемся отмены: прогрев снимает свою блокировку в Redis
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    tasks = [revocations_task, invalidations_task, index_events_task, es_nodes_task]
+    if rankings_task:
+        tasks.append(rankings_task)
+    for task in tasks:
+        task.cancel()
+    # задачи ещё держат соединения Redis и ES — закрываем клиенты, когда они завершились
+    await asyncio.gather(*tasks, return_exceptions=True)
     await redis.redis.close()
     await elastic.es.close()
+    await pool.client.aclose()
 
 app = FastAPI(
     # Конфигурируем название проекта. Оно будет отображаться в документации
@@ -47,9 +92,56 @@ async def validation_exception_handler(request: Request, exc: ValidationError):
         content={"detail": exc.errors()},
     )
 
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": str(exc)},
+    )
+
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    # бюджет времени запроса; клиент может его сократить, но не увеличить
+    budget_ms = settings.es.deadline_ms
+    try:
+        budget_ms = min(budget_ms, int(request.headers.get("x-request-timeout-ms", budget_ms)))
+    except ValueError:
+        pass
+    deadline.set_timeout(budget_ms / 1000)
+    return await call_next(request)
+
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    # курсор испорчен или его point in time истёк — клиент начинает обход заново
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": str(exc)},
+    )
+
+@app.exception_handler(TooManyCursors)
+async def too_many_cursors_handler(request: Request, exc: TooManyCursors):
+    # лимит открытых point in time инстанса; место освободится, когда истечёт keep_alive брошенных обходов
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(settings.es.pit_keep_alive_sec)},
+    )
+
 app.include_router(films.router, prefix='/api/v1/films', tags=['films'])
 app.include_router(persons.router, prefix='/api/v1/persons', tags=['person'])
 app.include_router(genres.router, prefix='/api/v1/genres', tags=['genre'])
+app.include_router(search.router, prefix='/api/v1/search', tags=['search'])
+# служебные ручки инстанса; nginx проксирует наружу только /api/ и /auth/, но и внутри сети
+# метрики раскрывают внутреннее состояние, а прогрев нагружает ES — только для роли admin
+app.include_router(
+    metrics.router, prefix='/internal/metrics', tags=['metrics'], dependencies=[Depends(require_roles('admin'))]
+)
+app.include_router(
+    cache.router, prefix='/internal/cache', tags=['cache'], dependencies=[Depends(require_roles('admin'))]
+)
 
 if jaeger_settings.debug:
     configure_tracer()
@@ -6,6 +6,24 @@ from typing import Optional, List
 from uuid import UUID
 
 MAX_WINDOW = 10000
+MAX_PAGE_SIZE = 1000
+
+CURSOR_DESCRIPTION = (
+    "Курсор из заголовка X-Next-Cursor предыдущего ответа; пустая строка — начать обход. "
+    "В режиме курсора page_number не используется, а глубина страниц не ограничена"
+)
+
+def check_es_window(page_number: int, page_size: int, cursor: Optional[str]) -> None:
+    # обход курсором окном from + size не ограничен
+    if cursor is not None:
+        return
+    from_ = (page_number - 1) * page_size
+    if from_ + page_size > MAX_WINDOW:
+        max_page = (MAX_WINDOW - page_size) // page_size + 1
+        raise PydanticCustomError(
+            "es_window_limit",
+            f"page_number too large for page_size={page_size}; max page is {max_page}",
+        )
 
 class Film(BaseModel):
     id: str
@@ -16,12 +34,21 @@ class FilmsQuery(BaseModel):
         default="-imdb_rating",
         description="Поле сортировки, например: '-imdb_rating' или 'title'"
     )
-    page_size: int = Field(50, ge=1)
+    page_size: int = Field(50, ge=1, le=MAX_PAGE_SIZE)
     page_number: int = Field(1, ge=1)
     genre: Optional[str] = Field(
         default=None,
         description="ID жанра для фильтрации"
     )
+    cursor: Optional[str] = Field(
+        default=None,
+        description=CURSOR_DESCRIPTION,
+    )
+
+    @model_validator(mode="after")
+    def check_es_limit(self):
+        check_es_window(self.page_number, self.page_size, self.cursor)
+        return self
 
 class FilmShort(BaseModel):
     id: str
@@ -33,20 +60,26 @@ FilmsListResponse = List[FilmShort]
 class SearchQuery(BaseModel):
     query: str = Field(..., min_length=1, description="Строка поиска")
     page_number: int = Field(1, ge=1)
-    page_size: int = Field(50, ge=1, le=1000)
+    page_size: int = Field(50, ge=1, le=MAX_PAGE_SIZE)
+    cursor: Optional[str] = Field(None, description=CURSOR_DESCRIPTION)
 
     @model_validator(mode="after")
     def check_es_limit(self):
-        from_ = (self.page_number - 1) * self.page_size
-        if from_ + self.page_size > MAX_WINDOW:
-            max_page = (MAX_WINDOW - self.page_size) // self.page_size + 1
-            raise PydanticCustomError(
-                "es_window_limit",
-                f"page_number too large for page_size={self.page_size}; max page is {max_page}",
-            )
+        check_es_window(self.page_number, self.page_size, self.cursor)
         return self
 
 
+class SuggestQuery(BaseModel):
+    prefix: str = Field(..., min_length=1, max_length=100, description="Начало названия или имени")
+    size: int = Field(5, ge=1, le=20)
+
+class FilmSuggestion(BaseModel):
+    id: str
+    title: str
+
+FilmSuggestResponse = List[FilmSuggestion]
+
+
 class GenreItem(BaseModel):
     id: str
     name: str
@@ -63,4 +96,16 @@ class FilmDetail(BaseModel):
     genre: List[GenreItem] = []
     actors: List[PersonItem] = []
     writers: List[PersonItem] = []
-    directors: List[PersonItem] = []
\ No newline at end of file
+    directors: List[PersonItem] = []
+
+
+MAX_BATCH_SIZE = 100
+
+class FilmsBatchRequest(BaseModel):
+    ids: List[UUID] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE, description="ID фильмов")
+
+class FilmsBatchItem(BaseModel):
+    id: str
+    film: Optional[FilmDetail] = Field(None, description="null, если фильм не найден")
+
+FilmsBatchResponse = List[FilmsBatchItem]
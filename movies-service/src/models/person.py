@@ -24,4 +24,10 @@ class PersonSearchItem(BaseModel):
     full_name: str
     films: List[PersonSearchFilm] = Field(default_factory=list)
 
-PersonsSearchResponse = List[PersonSearchItem]
\ No newline at end of file
+PersonsSearchResponse = List[PersonSearchItem]
+
+class PersonSuggestion(BaseModel):
+    id: str
+    full_name: str
+
+PersonSuggestResponse = List[PersonSuggestion]
@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+from models.film import FilmShort
+from models.person import PersonSearchItem
+
+class UnifiedSearchQuery(BaseModel):
+    query: str = Field(..., min_length=1, description="Строка поиска")
+    size: int = Field(10, ge=1, le=50, description="Сколько фильмов и сколько персон вернуть")
+
+class SearchResponse(BaseModel):
+    films: List[FilmShort] = Field(default_factory=list)
+    persons: List[PersonSearchItem] = Field(default_factory=list)
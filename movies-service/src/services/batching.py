@@ -0,0 +1,152 @@
+"""Микробатчинг запросов к Elasticsearch.
+
+Поиски и чтения по id, пришедшие в пределах ES_BATCH_WINDOW_MS (или как
+только их набралось ES_BATCH_MAX_SIZE), уходят в ES одним _msearch и одним
+_mget, а ответы раздаются ожидающим корутинам. Окно — цена в задержке
+одного запроса за меньшее число HTTP-запросов к ES под нагрузкой.
+"""
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends
+
+from core import metrics
+from core.config import settings
+from db.elastic import get_elastic
+
+logger = logging.getLogger(__name__)
+
+# границы гистограммы размеров пачек
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# параметры AsyncElasticsearch.search -> поля тела запроса в _msearch
+_BODY_FIELDS = {"from_": "from", "source_includes": "_source"}
+
+
+class BatchItemError(Exception):
+    """Ошибка отдельного запроса внутри _msearch."""
+
+    def __init__(self, status: Optional[int], error: Any):
+        super().__init__(f"msearch item failed with status {status}: {error}")
+        self.status = status
+        self.error = error
+
+
+class ElasticBatcher:
+    def __init__(self, es: AsyncElasticsearch, window_ms: float, max_size: int):
+        self._es = es
+        self._window = window_ms / 1000
+        self._max_size = max_size
+        self._searches: List[Tuple[dict, dict, asyncio.Future]] = []
+        self._gets: List[Tuple[str, str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.queries = 0
+        self.max_batch = 0
+        self.size_hist = {f"le_{b}": 0 for b in BATCH_SIZE_BUCKETS} | {"gt_64": 0}
+
+    async def search(self, index: str, request_cache: bool = False, **params: Any) -> Dict[str, Any]:
+        """Ответ на поиск, как у AsyncElasticsearch.search(index=..., **params)."""
+        header: dict = {"index": index}
+        if request_cache:
+            header["request_cache"] = True
+        body = {_BODY_FIELDS.get(k, k): v for k, v in params.items()}
+        future = asyncio.get_running_loop().create_future()
+        self._searches.append((header, body, future))
+        self._schedule()
+        return await future
+
+    async def get(self, index: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """_source документа или None, если его нет."""
+        future = asyncio.get_running_loop().create_future()
+        self._gets.append((index, doc_id, future))
+        self._schedule()
+        return await future
+
+    def _schedule(self) -> None:
+        if len(self._searches) + len(self._gets) >= self._max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._window, self._flush)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        searches, self._searches = self._searches, []
+        gets, self._gets = self._gets, []
+        if searches:
+            self._spawn(self._send_searches(searches))
+        if gets:
+            self._spawn(self._send_gets(gets))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_searches(self, batch: List[Tuple[dict, dict, asyncio.Future]]) -> None:
+        self._record(len(batch))
+        try:
+            resp = await self._es.msearch(searches=[part for header, body, _ in batch for part in (header, body)])
+        except Exception as e:
+            _fail(batch, e)
+            return
+        for (_, _, future), item in zip(batch, resp["responses"]):
+            if future.done():
+                # ожидавший запрос уже отменён
+                continue
+            if "error" in item:
+                future.set_exception(BatchItemError(item.get("status"), item["error"]))
+            else:
+                future.set_result(item)
+
+    async def _send_gets(self, batch: List[Tuple[str, str, asyncio.Future]]) -> None:
+        self._record(len(batch))
+        try:
+            resp = await self._es.mget(docs=[{"_index": index, "_id": doc_id} for index, doc_id, _ in batch])
+        except Exception as e:
+            _fail(batch, e)
+            return
+        for (_, _, future), doc in zip(batch, resp["docs"]):
+            if not future.done():
+                future.set_result(doc["_source"] if doc.get("found") else None)
+
+    def _record(self, size: int) -> None:
+        self.batches += 1
+        self.queries += size
+        self.max_batch = max(self.max_batch, size)
+        bucket = next((f"le_{b}" for b in BATCH_SIZE_BUCKETS if size <= b), "gt_64")
+        self.size_hist[bucket] += 1
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self._window * 1000,
+            "max_size": self._max_size,
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch": round(self.queries / self.batches, 2) if self.batches else 0,
+            "max_batch": self.max_batch,
+            "batch_sizes": self.size_hist,
+        }
+
+
+def _fail(batch: list, error: Exception) -> None:
+    for *_, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+@lru_cache()
+def get_es_batcher(elastic: AsyncElasticsearch = Depends(get_elastic)) -> ElasticBatcher:
+    batcher = ElasticBatcher(
+        elastic,
+        window_ms=settings.es.batch_window_ms,
+        max_size=settings.es.batch_max_size,
+    )
+    metrics.register("es_batching", batcher.stats)
+    return batcher
@@ -0,0 +1,476 @@
+import asyncio
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable, Iterable, Optional, Sequence
+
+from fastapi import Depends
+from redis.asyncio import Redis
+
+from core import deadline, metrics
+from core.config import settings
+from core.singleflight import SingleFlight
+from db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# идентификатор процесса: свои же сообщения об инвалидации пропускаем
+INSTANCE_ID = uuid.uuid4().hex
+
+
+# отметка «такого id нет»: не JSON и не gzip, с закэшированным значением не спутать
+NOT_FOUND = b"\x00"
+
+
+class AbstractCache(ABC):
+    """Кэш JSON-байтов (см. services.codec).
+
+    Отсутствующие в хранилище id кэшируются значением NOT_FOUND на
+    CACHE_NEGATIVE_TTL_SEC, чтобы повторные запросы несуществующих id
+    не доходили до Elasticsearch.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: int | None = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            await self.delete(key)
+
+    async def set_not_found(self, *keys: str) -> None:
+        await self.set_many(dict.fromkeys(keys, NOT_FOUND), ttl=settings.cache.negative_ttl_sec)
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[bytes]]:
+        """Значения в порядке ключей; None — промах."""
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, items: dict[str, bytes], ttl: int | None = None) -> None:
+        for key, value in items.items():
+            await self.set(key, value, ttl=ttl)
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[tuple[Optional[bytes], Optional[float]]]:
+        """Значения и сколько секунд им осталось жить; None вместо срока — бессрочно."""
+        return [(value, None) for value in await self.get_many(keys)]
+
+    async def replace_many(self, items: dict[str, bytes], ttl: int | None = None) -> list[str]:
+        """Как set_many, но возвращает ключи, у которых уже было значение."""
+        await self.set_many(items, ttl=ttl)
+        return list(items)
+
+
+class RedisCache(AbstractCache):
+    def __init__(self, client: Redis):
+        self._client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        # Пытаемся получить данные о фильме из кеша, используя команду get
+        # https://redis.io/commands/get/
+        # redis возвращает bytes — их и отдаём, без декодирования
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int | None = None) -> None:
+        # Сохраняем данные о фильме, используя команду set
+        # Выставляем время жизни кеша — 5 минут
+        # https://redis.io/commands/set/
+        # значение уже закодировано в JSON (services.codec)
+        if ttl:
+            await self._client.set(key, value, ex=ttl)
+        else:
+            await self._client.set(key, value)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        if keys := list(keys):
+            await self._client.delete(*keys)
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[bytes]]:
+        # один MGET вместо GET на каждый ключ
+        # https://redis.io/commands/mget/
+        return await self._client.mget(keys) if keys else []
+
+    async def set_many(self, items: dict[str, bytes], ttl: int | None = None) -> None:
+        if not items:
+            return
+        # MSET не умеет TTL — пишем SET-ами одним пайплайном
+        pipe = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(key, value, ex=ttl or None)
+        await pipe.execute()
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[tuple[Optional[bytes], Optional[float]]]:
+        if not keys:
+            return []
+        # GET и PTTL каждого ключа в одной транзакции: срок относится именно к прочитанному значению
+        # https://redis.io/commands/pttl/
+        pipe = self._client.pipeline(transaction=True)
+        for key in keys:
+            pipe.get(key)
+            pipe.pttl(key)
+        results = await pipe.execute()
+        # PTTL: -1 — ключ без срока, -2 — ключа нет
+        return [
+            (value, None if pttl == -1 else max(pttl, 0) / 1000)
+            for value, pttl in zip(results[::2], results[1::2])
+        ]
+
+    async def replace_many(self, items: dict[str, bytes], ttl: int | None = None) -> list[str]:
+        if not items:
+            return []
+        # EXISTS перед каждым SET в той же транзакции — без передачи старых значений, как у SET ... GET
+        pipe = self._client.pipeline(transaction=True)
+        for key, value in items.items():
+            pipe.exists(key)
+            pipe.set(key, value, ex=ttl or None)
+        existed = (await pipe.execute())[::2]
+        return [key for key, found in zip(items, existed) if found]
+
+
+class LocalCache:
+    """LRU в памяти процесса с ограничением по размеру и TTL."""
+
+    def __init__(self, max_size: int, ttl: int):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._items: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        if self._max_size <= 0:
+            return
+        ttl = min(ttl, self._ttl) if ttl else self._ttl
+        self._items[key] = (time.monotonic() + ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._items.pop(key, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._items),
+            "max_size": self._max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class TieredCache(AbstractCache):
+    """Двухуровневый кэш: LRU процесса перед Redis.
+
+    Повторные попадания не покидают процесс. Локальная копия живёт не
+    дольше ключа в Redis (срок берётся из PTTL при чтении), поэтому копия
+    может быть у других инстансов, только пока ключ есть в Redis.
+    Перезапись существующего ключа и удаление публикуются в канал
+    инвалидации, и остальные инстансы выбрасывают свою локальную копию
+    (см. listen_invalidations); запись нового ключа не публикуется.
+    """
+
+    def __init__(self, local: LocalCache, remote: AbstractCache, client: Redis):
+        self._local = local
+        self._remote = remote
+        self._client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if (value := self._local.get(key)) is not None:
+            return value
+        ((value, ttl),) = await self._remote.get_many_with_ttl([key])
+        self._remember(key, value, ttl)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int | None = None) -> None:
+        await self.set_many({key: value}, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._remote.delete(key)
+        self._local.delete(key)
+        await self._publish(key)
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        if not (keys := list(keys)):
+            return
+        await self._remote.delete_many(keys)
+        for key in keys:
+            self._local.delete(key)
+        await self._publish(*keys)
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[bytes]]:
+        values = [self._local.get(key) for key in keys]
+        missed = [key for key, value in zip(keys, values) if value is None]
+        if not missed:
+            return values
+        fetched = {}
+        for key, (value, ttl) in zip(missed, await self._remote.get_many_with_ttl(missed)):
+            self._remember(key, value, ttl)
+            fetched[key] = value
+        return [fetched.get(key) if value is None else value for key, value in zip(keys, values)]
+
+    async def set_many(self, items: dict[str, bytes], ttl: int | None = None) -> None:
+        if not items:
+            return
+        replaced = await self._remote.replace_many(items, ttl=ttl)
+        for key, value in items.items():
+            self._local.set(key, value, ttl)
+        # нового ключа ни у кого в локальном кэше нет — сообщать не о чем
+        if replaced:
+            await self._publish(*replaced)
+
+    def _remember(self, key: str, value: Optional[bytes], ttl: Optional[float]) -> None:
+        # копия из Redis не должна пережить ключ: ни NOT_FOUND, ни SWR-конверт у жёсткого истечения
+        if value is not None and (ttl is None or ttl > 0):
+            self._local.set(key, value, ttl)
+
+    async def _publish(self, *keys: str) -> None:
+        # одно сообщение на пачку ключей: "<instance>|key1\nkey2..."
+        await self._client.publish(settings.cache.invalidation_channel, f"{INSTANCE_ID}|" + "\n".join(keys))
+
+
+class CacheTags:
+    """Теги ключей кэша: tag:<сущность> -> множество ключей, где эта сущность встречается.
+
+    Нужны для списков и поиска — по id изменившегося фильма или персоны
+    находим все страницы, в которые он попал.
+    """
+
+    def __init__(self, client: Redis):
+        self._client = client
+
+    async def add(self, key: str, tags: Iterable[str], ttl: int) -> None:
+        pipe = self._client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.sadd(f"tag:{tag}", key)
+            pipe.expire(f"tag:{tag}", ttl)
+        await pipe.execute()
+
+    async def pop_keys(self, tags: Iterable[str]) -> set[str]:
+        """Ключи, помеченные любым из тегов; сами теги удаляются."""
+        tags = [f"tag:{tag}" for tag in tags]
+        if not tags:
+            return set()
+        pipe = self._client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.smembers(tag)
+        pipe.delete(*tags)
+        *members, _ = await pipe.execute()
+        return {
+            k.decode() if isinstance(k, (bytes, bytearray)) else k
+            for keys in members for k in keys
+        }
+
+
+# удаляем аренду, только если она всё ещё наша
+RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class StaleWhileRevalidate:
+    """Soft/hard TTL поверх кэша с защитой от «стада» (dogpile).
+
+    Запись хранится hard_ttl секунд вместе с моментом мягкого истечения.
+    После soft_ttl запросы продолжают получать старое значение, а один из них
+    обновляет запись в фоне. Пересчёт ключа всегда один: внутри процесса —
+    через SingleFlight, между инстансами — через аренду в Redis (SET NX PX).
+    """
+
+    def __init__(self, cache: AbstractCache, client: Redis, lease_ms: int):
+        self._cache = cache
+        self._client = client
+        self._lease_ms = lease_ms
+        self._release = client.register_script(RELEASE_LEASE)
+        self._flights = SingleFlight()
+        self._refreshing: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self.stale_hits = 0
+        self.refreshes = 0
+
+    async def get(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Optional[bytes]]],
+        soft_ttl: int,
+        hard_ttl: int,
+    ) -> Optional[bytes]:
+        """Значение по ключу; compute вызывается при промахе или в фоне после soft_ttl.
+
+        Если compute вернул None, в кэш ничего не пишется.
+        """
+        raw = await self._cache.get(key)
+        if raw is not None and (entry := self._unpack(raw)) is not None:
+            soft_expires_at, value = entry
+            if soft_expires_at <= time.time():
+                self.stale_hits += 1
+                self._refresh_in_background(key, compute, soft_ttl, hard_ttl)
+            return value
+        return await self._flights.do(key, lambda: self._load(key, compute, soft_ttl, hard_ttl))
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[bytes]]:
+        """Значения одним MGET; записи после soft_ttl считаются промахом.
+
+        Фонового обновления здесь нет — промахи вызывающий догружает сам
+        и записывает через set.
+        """
+        now = time.time()
+        values: list[Optional[bytes]] = []
+        for raw in await self._cache.get_many(keys):
+            entry = self._unpack(raw) if raw is not None else None
+            values.append(entry[1] if entry is not None and entry[0] > now else None)
+        return values
+
+    async def set(self, key: str, value: bytes, soft_ttl: int, hard_ttl: int) -> None:
+        await self._cache.set(key, f"{time.time() + soft_ttl}|".encode() + value, ttl=hard_ttl)
+
+    async def _load(self, key, compute, soft_ttl, hard_ttl) -> Optional[bytes]:
+        token = uuid.uuid4().hex
+        lease_deadline = time.monotonic() + self._lease_ms / 1000
+        try:
+            while not await self._acquire(key, token):
+                # ключ уже пересчитывает другой инстанс — ждём его результат
+                await asyncio.sleep(0.05)
+                raw = await self._cache.get(key)
+                if raw is not None and (entry := self._unpack(raw)) is not None:
+                    return entry[1]
+                if time.monotonic() >= lease_deadline:
+                    break
+            return await self._compute_and_store(key, compute, soft_ttl, hard_ttl)
+        finally:
+            await self._release(keys=[self._lease_key(key)], args=[token])
+
+    def _refresh_in_background(self, key, compute, soft_ttl, hard_ttl) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, compute, soft_ttl, hard_ttl))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, key, compute, soft_ttl, hard_ttl) -> None:
+        # задача унаследовала контекст запроса — его дедлайн к фоновому обновлению не относится
+        deadline.clear()
+        token = uuid.uuid4().hex
+        try:
+            if not await self._acquire(key, token):
+                return
+            try:
+                await self._compute_and_store(key, compute, soft_ttl, hard_ttl)
+                self.refreshes += 1
+            finally:
+                await self._release(keys=[self._lease_key(key)], args=[token])
+        except Exception as e:
+            logger.error(f"Фоновое обновление ключа {key} не удалось: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def _compute_and_store(self, key, compute, soft_ttl, hard_ttl) -> Optional[bytes]:
+        value = await compute()
+        if value is not None:
+            await self.set(key, value, soft_ttl, hard_ttl)
+        return value
+
+    async def _acquire(self, key: str, token: str) -> bool:
+        return bool(await self._client.set(self._lease_key(key), token, nx=True, px=self._lease_ms))
+
+    @staticmethod
+    def _lease_key(key: str) -> str:
+        return f"lease:{key}"
+
+    @staticmethod
+    def _unpack(raw: bytes) -> Optional[tuple[float, bytes]]:
+        soft_expires_at, sep, value = raw.partition(b"|")
+        try:
+            return float(soft_expires_at), value
+        except ValueError:
+            # запись старого формата, без мягкого TTL — считаем промахом
+            return None
+
+    def stats(self) -> dict:
+        return {
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "refreshing": len(self._refreshing),
+        }
+
+
+local_cache = LocalCache(max_size=settings.cache.local_max_size, ttl=settings.cache.local_ttl_sec)
+metrics.register("local_cache", local_cache.stats)
+
+
+async def listen_invalidations(client: Redis, local: LocalCache) -> None:
+    """Слушает канал инвалидации и выбрасывает изменённые ключи из локального кэша."""
+    while True:
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(settings.cache.invalidation_channel)
+            # пока подписки не было, сообщения могли потеряться — начинаем с чистого листа
+            local.clear()
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                data = message["data"]
+                data = data.decode() if isinstance(data, (bytes, bytearray)) else data
+                sender, _, keys = data.partition("|")
+                if sender != INSTANCE_ID:
+                    for key in keys.split("\n"):
+                        local.delete(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Подписка на инвалидацию кэша прервана: {e}")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.close()
+
+
+@lru_cache()
+def get_cache(redis: Redis = Depends(get_redis)) -> AbstractCache:
+    return TieredCache(local=local_cache, remote=RedisCache(redis), client=redis)
+
+
+@lru_cache()
+def get_swr_cache(
+    cache: AbstractCache = Depends(get_cache),
+    redis: Redis = Depends(get_redis),
+) -> StaleWhileRevalidate:
+    swr = StaleWhileRevalidate(cache, redis, lease_ms=settings.cache.lease_ms)
+    metrics.register("swr_cache", swr.stats)
+    return swr
+
+
+@lru_cache()
+def get_cache_tags(redis: Redis = Depends(get_redis)) -> CacheTags:
+    return CacheTags(redis)
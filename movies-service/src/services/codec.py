@@ -0,0 +1,71 @@
+"""Кодек значений кэша.
+
+В кэше лежат готовые JSON-байты (orjson): при попадании их можно отдать
+клиенту как есть, без json.loads и повторной валидации моделей, которые
+уже прошли валидацию перед записью в кэш. Значения больше порога
+хранятся в gzip — такие байты уходят клиенту с Content-Encoding: gzip.
+
+Блоки списков (dump_lines) не сжимаются: страница вырезается из них
+срезом байтов, без распаковки, разбора JSON и повторного gzip.
+"""
+import gzip
+from typing import Any, Sequence
+
+import orjson
+from pydantic import BaseModel
+
+from core.config import settings
+
+EMPTY_LIST = b"[]"
+
+# JSON не может начинаться с этих байтов, поэтому отдельный маркер не нужен
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(value: BaseModel | Sequence[BaseModel] | Any) -> bytes:
+    """Модель, список моделей или обычные dict/list -> JSON-байты (сжатые, если больше порога)."""
+    raw = orjson.dumps(value, default=_default)
+    if len(raw) < settings.cache.compress_min_bytes:
+        return raw
+    # mtime=0 — одинаковый JSON даёт одинаковые байты
+    return gzip.compress(raw, compresslevel=settings.cache.compress_level, mtime=0)
+
+
+def is_compressed(raw: bytes) -> bool:
+    return raw[:2] == GZIP_MAGIC
+
+
+def decompress(raw: bytes) -> bytes:
+    """Несжатые JSON-байты."""
+    return gzip.decompress(raw) if is_compressed(raw) else raw
+
+
+def loads(raw: bytes | str) -> Any:
+    if isinstance(raw, bytes):
+        raw = decompress(raw)
+    return orjson.loads(raw)
+
+
+def dump_lines(items: Sequence[BaseModel | Any]) -> bytes:
+    """Элементы по одному JSON на строку, без сжатия.
+
+    orjson не оставляет в JSON переводов строк (в строках они экранируются),
+    поэтому элементы разделяются по b"\n" без разбора.
+    """
+    return b"\n".join(orjson.dumps(item, default=_default) for item in items)
+
+
+def split_lines(raw: bytes) -> list[bytes]:
+    """Элементы значения, записанного dump_lines, — по-прежнему JSON-байты."""
+    return raw.split(b"\n") if raw else []
+
+
+def join(items: Sequence[bytes]) -> bytes:
+    """JSON-массив из уже закодированных (несжатых) элементов."""
+    return b"[" + b",".join(items) + b"]"
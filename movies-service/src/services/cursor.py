@@ -0,0 +1,155 @@
+"""Постраничный обход индекса через point in time и search_after.
+
+Глубина страницы на стоимость запроса не влияет, ограничения окна
+from + size (MAX_WINDOW) нет. Курсор для клиента непрозрачен: это
+base64 от id point in time и sort-значений последнего хита.
+
+Каждый point in time держит контекст поиска на шардах, а число таких
+контекстов в кластере ограничено (search.max_open_scroll_context).
+Брошенный обход закрыть некому, поэтому point in time живёт недолго
+(ES_PIT_KEEP_ALIVE_SEC), а открытых этим инстансом — не больше
+ES_PIT_MAX_OPEN: сверх лимита новый обход получает 429.
+"""
+import base64
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from elasticsearch import AsyncElasticsearch, BadRequestError, NotFoundError
+
+from core import metrics
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """Курсор повреждён или его point in time уже истёк."""
+
+
+class TooManyCursors(Exception):
+    """У инстанса уже открыто ES_PIT_MAX_OPEN point in time."""
+
+
+class OpenPits:
+    """point in time, открытые этим инстансом и ещё не истёкшие."""
+
+    def __init__(self, max_open: int, keep_alive_sec: int):
+        self._max_open = max_open
+        self._keep_alive_sec = keep_alive_sec
+        self.keep_alive = f"{keep_alive_sec}s"
+        # id -> момент истечения; keep_alive одинаковый, поэтому порядок — по истечению
+        self._expires: OrderedDict[str, float] = OrderedDict()
+        self._opening = 0
+        self.opened = 0
+        self.rejected = 0
+
+    def reserve(self) -> None:
+        """Место под новый point in time; сверх лимита — TooManyCursors."""
+        now = time.monotonic()
+        while self._expires and next(iter(self._expires.values())) <= now:
+            self._expires.popitem(last=False)
+        if len(self._expires) + self._opening >= self._max_open:
+            self.rejected += 1
+            raise TooManyCursors("too many open cursors, try again later")
+        self._opening += 1
+
+    def opened_pit(self, pit_id: Optional[str]) -> None:
+        """Снять резерв; pit_id=None — открыть не удалось."""
+        self._opening -= 1
+        if pit_id is not None:
+            self.opened += 1
+            self._expires[pit_id] = time.monotonic() + self._keep_alive_sec
+
+    def touch(self, old_id: str, new_id: str) -> None:
+        """Страница прочитана: keep_alive продлён, а ES мог вернуть новый id."""
+        if self._expires.pop(old_id, None) is None:
+            # point in time открыт другим инстансом — его считает тот
+            return
+        self._expires[new_id] = time.monotonic() + self._keep_alive_sec
+
+    def forget(self, pit_id: str) -> None:
+        self._expires.pop(pit_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "open": len(self._expires),
+            "max_open": self._max_open,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+open_pits = OpenPits(max_open=settings.es.pit_max_open, keep_alive_sec=settings.es.pit_keep_alive_sec)
+metrics.register("es_pit", open_pits.stats)
+
+
+def encode(pit_id: str, after: List[Any]) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps({"pit": pit_id, "after": after})).decode()
+
+
+def decode(cursor: str) -> Tuple[str, List[Any]]:
+    try:
+        data = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return data["pit"], data["after"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("malformed cursor") from e
+
+
+async def search_page(
+    es: AsyncElasticsearch,
+    index: str,
+    query: Dict[str, Any],
+    sort: List[Dict[str, Any]],
+    size: int,
+    cursor: str,
+    source_includes: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Страница документов и курсор следующей (None — это последняя страница).
+
+    Пустой cursor открывает новый point in time и начинает обход с начала.
+    """
+    if cursor:
+        pit_id, after = decode(cursor)
+    else:
+        open_pits.reserve()
+        pit_id, after = None, None
+        try:
+            pit_id = (await es.open_point_in_time(index=index, keep_alive=open_pits.keep_alive))["id"]
+        finally:
+            open_pits.opened_pit(pit_id)
+
+    extra = {"search_after": after} if after else {}
+    if source_includes:
+        extra["source_includes"] = source_includes
+    try:
+        resp = await es.search(
+            pit={"id": pit_id, "keep_alive": open_pits.keep_alive},
+            query=query,
+            # _shard_doc — тайбрейкер: порядок однозначен и при равных значениях сортировки
+            sort=[*sort, {"_shard_doc": "asc"}],
+            size=size,
+            track_total_hits=False,
+            **extra,
+        )
+    except (NotFoundError, BadRequestError) as e:
+        open_pits.forget(pit_id)
+        raise InvalidCursor("cursor expired or invalid") from e
+
+    hits = resp["hits"]["hits"]
+    open_pits.touch(pit_id, resp.get("pit_id", pit_id))
+    pit_id = resp.get("pit_id", pit_id)
+    docs = [hit["_source"] for hit in hits]
+    if len(hits) < size:
+        open_pits.forget(pit_id)
+        try:
+            await es.close_point_in_time(id=pit_id)
+        except Exception as e:
+            # не закрыли — point in time сам истечёт через keep_alive
+            logger.warning(f"Не удалось закрыть point in time: {e}")
+        return docs, None
+    return docs, encode(pit_id, hits[-1]["sort"])
@@ -1,37 +1,45 @@
-import json
+import asyncio
 import random
+import unicodedata
 
 from functools import lru_cache
-from typing import List, Dict, Any, Optional, Sequence
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
 from uuid import UUID
 
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
-from redis.asyncio import Redis
 
 from db.elastic import get_elastic
-from db.redis import get_redis
-from models.film import FilmsQuery, FilmShort, FilmsListResponse, SearchQuery, FilmDetail
+from models.film import (
+    MAX_PAGE_SIZE, FilmsQuery, FilmShort, SearchQuery, FilmDetail, FilmSuggestion, SuggestQuery,
+)
 
+from core import deadline
 from core.config import settings, Resource
+from services import codec
+from services.batching import ElasticBatcher, get_es_batcher
+from services.cursor import search_page
+from services.hedging import hedged_reads
+from services.rankings import RANKED_SORT, FilmRankings, get_film_rankings
+from services.cache import (
+    NOT_FOUND, AbstractCache, CacheTags, StaleWhileRevalidate, get_cache, get_cache_tags, get_swr_cache,
+)
 
 from abc import ABC, abstractmethod
 
 
 FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
 
-class AbstractCache(ABC):
-    @abstractmethod
-    async def get(self, key: str) -> Optional[str]:
-        ...
+# списки и поиск отдают только FilmShort — остальное из _source не тянем
+SHORT_SOURCE = ["id", "title", "imdb_rating"]
 
-    @abstractmethod
-    async def set(self, key: str, value: str, ttl: int | None = None) -> None:
-        ...
 
-    @abstractmethod
-    async def delete(self, key: str) -> None:
-        ...
+def normalize_query(query: str) -> str:
+    """Поисковая строка в каноническом виде: NFKC, без регистра, одиночные пробелы.
+
+    «Star  Wars», «star wars» и «ＳＴＡＲ WARS» дают один ключ кэша и один запрос в ES.
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
 
 
 class AbstractDataStorage(ABC):
@@ -39,6 +47,11 @@ class AbstractDataStorage(ABC):
     async def get_by_id(self, film_id: UUID | str) -> Optional[Dict[str, Any]]:
         ...
 
+    @abstractmethod
+    async def get_many(self, film_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Найденные документы по id; отсутствующих id в ответе нет."""
+        ...
+
     @abstractmethod
     async def list_films(
         self, sort: Optional[str], page_number: int, page_size: int, genre: Optional[str] = None
@@ -51,6 +64,24 @@ class AbstractDataStorage(ABC):
     ) -> Sequence[Dict[str, Any]]:
         ...
 
+    @abstractmethod
+    async def suggest(self, prefix: str, size: int) -> Sequence[Dict[str, Any]]:
+        """id и title фильмов, название которых (или его хвост) начинается с prefix."""
+        ...
+
+    @abstractmethod
+    async def list_films_after(
+        self, sort: Optional[str], page_size: int, cursor: str, genre: Optional[str] = None
+    ) -> Tuple[Sequence[Dict[str, Any]], Optional[str]]:
+        """Страница списка по курсору и курсор следующей (None — страниц больше нет)."""
+        ...
+
+    @abstractmethod
+    async def search_after(
+        self, query: str, page_size: int, cursor: str,
+    ) -> Tuple[Sequence[Dict[str, Any]], Optional[str]]:
+        ...
+
 
 class ElasticDataStorage(AbstractDataStorage):
     def __init__(self, es: AsyncElasticsearch):
@@ -58,12 +89,37 @@ class ElasticDataStorage(AbstractDataStorage):
         self._index = settings.es.index_for(Resource.films)
 
     async def get_by_id(self, film_id: UUID | str) -> Optional[Dict[str, Any]]:
+        async def call(preference: Optional[str]) -> Dict[str, Any]:
+            return await self._client().get(index=self._index, id=str(film_id), preference=preference)
+
         try:
-            doc = await self._es.get(index=self._index, id=str(film_id))
+            doc = await hedged_reads.run("get", call)
         except NotFoundError:
             return None
         return doc["_source"]
 
+    async def _search(self, **params: Any) -> Dict[str, Any]:
+        async def call(preference: Optional[str]) -> Dict[str, Any]:
+            return await self._client().search(index=self._index, preference=preference, **params)
+
+        return await hedged_reads.run("search", call)
+
+    def _client(self) -> AsyncElasticsearch:
+        return self.deadline_client(self._es)
+
+    @staticmethod
+    def deadline_client(es: AsyncElasticsearch) -> AsyncElasticsearch:
+        # таймаут запроса к ES не дольше, чем осталось до дедлайна HTTP-запроса
+        if (budget := deadline.remaining()) is not None:
+            return es.options(request_timeout=max(budget, 0.001))
+        return es
+
+    async def get_many(self, film_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        if not film_ids:
+            return {}
+        resp = await self._es.mget(index=self._index, ids=list(film_ids))
+        return {d["_id"]: d["_source"] for d in resp["docs"] if d.get("found")}
+
     async def list_films(
         self, sort: Optional[str], page_number: int, page_size: int, genre: Optional[str] = None
     ) -> Sequence[Dict[str, Any]]:
@@ -71,20 +127,29 @@ class ElasticDataStorage(AbstractDataStorage):
         es_sort = self._es_sort_from_query(sort)
         es_query = self._build_films_query_nested_genre(genre)
 
-        resp = await self._es.search(
-            index=self._index,
+        resp = await self._search(
             query=es_query,
             sort=es_sort,
             from_=from_,
             size=page_size,
+            source_includes=SHORT_SOURCE,
+            # общее число совпадений в ответе не используется
+            track_total_hits=False,
+            # запрос детерминирован — пусть шард кэширует ответ целиком
+            request_cache=True,
         )
         return [hit["_source"] for hit in resp["hits"]["hits"]]
 
     def _build_films_query_nested_genre(self, genre_id: Optional[str]) -> Dict[str, Any]:
         if not genre_id:
             return {"match_all": {}}
+        # genre — nested-поле; фильтр без подсчёта релевантности кэшируется в query cache
         return {
-            "term": {"genre.id": genre_id}
+            "bool": {
+                "filter": [
+                    {"nested": {"path": "genre", "query": {"term": {"genre.id": genre_id}}}},
+                ]
+            }
         }
 
     def _es_sort_from_query(self, sort: Optional[str]) -> list[Dict[str, Any]]:
@@ -98,7 +163,19 @@ class ElasticDataStorage(AbstractDataStorage):
         self, query: str, page_number: int, page_size: int,
     ) -> Sequence[Dict[str, Any]]:
         from_ = (page_number - 1) * page_size
-        es_query = {
+        resp = await self._search(
+            query=self.search_query(query),
+            from_=from_,
+            size=page_size,
+            source_includes=SHORT_SOURCE,
+            track_total_hits=False,
+            request_cache=True,
+        )
+        return [hit["_source"] for hit in resp["hits"]["hits"]]
+
+    @staticmethod
+    def search_query(query: str) -> Dict[str, Any]:
+        return {
             "match": {
                 "title": {
                     "query": query,
@@ -106,101 +183,229 @@ class ElasticDataStorage(AbstractDataStorage):
                 }
             }
         }
-        resp = await self._es.search(
-            index=self._index,
-            query=es_query,
-            from_=from_,
+
+    async def suggest(self, prefix: str, size: int) -> Sequence[Dict[str, Any]]:
+        # completion suggester: префиксный поиск по FST в памяти, без подсчёта релевантности
+        resp = await self._search(
+            suggest={
+                "films": {
+                    "prefix": prefix,
+                    "completion": {"field": "title_suggest", "size": size, "skip_duplicates": True},
+                }
+            },
+            source_includes=["id", "title"],
+        )
+        return [option["_source"] for option in resp["suggest"]["films"][0]["options"]]
+
+    async def list_films_after(
+        self, sort: Optional[str], page_size: int, cursor: str, genre: Optional[str] = None
+    ) -> Tuple[Sequence[Dict[str, Any]], Optional[str]]:
+        return await search_page(
+            self._es,
+            self._index,
+            query=self._build_films_query_nested_genre(genre),
+            sort=self._es_sort_from_query(sort),
             size=page_size,
+            cursor=cursor,
+            source_includes=SHORT_SOURCE,
         )
-        return [hit["_source"] for hit in resp["hits"]["hits"]]
 
+    async def search_after(
+        self, query: str, page_size: int, cursor: str,
+    ) -> Tuple[Sequence[Dict[str, Any]], Optional[str]]:
+        return await search_page(
+            self._es,
+            self._index,
+            query=self.search_query(query),
+            sort=[{"_score": {"order": "desc"}}],
+            size=page_size,
+            cursor=cursor,
+            source_includes=SHORT_SOURCE,
+        )
 
-class RedisCache(AbstractCache):
-    def __init__(self, client: Redis):
-        self._client = client
 
-    async def get(self, key: str) -> Optional[str]:
-        # Пытаемся получить данные о фильме из кеша, используя команду get
-        # https://redis.io/commands/get/
-        val = await self._client.get(key)
-        if val is None:
-            return None
-        # redis возвращает bytes → приводим к str
-        return val.decode() if isinstance(val, (bytes, bytearray)) else val
+class BatchingDataStorage(ElasticDataStorage):
+    """ElasticDataStorage, чьи поиски и чтения по id собираются в _msearch/_mget.
+
+    Включается ES_BATCH_ENABLED; обход курсором и mget по списку id идут напрямую.
+    """
+
+    def __init__(self, es: AsyncElasticsearch, batcher: ElasticBatcher):
+        super().__init__(es)
+        self._batcher = batcher
 
-    async def set(self, key: str, value: str, ttl: int | None = None) -> None:
-        # Сохраняем данные о фильме, используя команду set
-        # Выставляем время жизни кеша — 5 минут
-        # https://redis.io/commands/set/
-        # pydantic позволяет сериализовать модель в json
-        if ttl:
-            await self._client.set(key, value, ex=ttl)
-        else:
-            await self._client.set(key, value)
+    async def get_by_id(self, film_id: UUID | str) -> Optional[Dict[str, Any]]:
+        return await self._batcher.get(self._index, str(film_id))
 
-    async def delete(self, key: str) -> None:
-        await self._client.delete(key)
+    async def _search(self, **params: Any) -> Dict[str, Any]:
+        return await self._batcher.search(self._index, **params)
 
 
 # FilmService содержит бизнес-логику по работе с фильмами. 
 # Никакой магии тут нет. Обычный класс с обычными методами. 
 # Этот класс ничего не знает про DI — максимально сильный и независимый.
 class FilmService:
-    def __init__(self, cache: AbstractCache, storage: AbstractDataStorage):
+    def __init__(
+        self,
+        cache: AbstractCache,
+        storage: AbstractDataStorage,
+        swr: StaleWhileRevalidate,
+        tags: CacheTags,
+        rankings: Optional[FilmRankings] = None,
+    ):
         self.cache = cache
         self.storage = storage
+        self.swr = swr
+        self.tags = tags
+        self.rankings = rankings
+
+    async def list_films(self, params: FilmsQuery) -> bytes:
+        """Страница списка фильмов — JSON-массив FilmShort."""
+        sort = params.sort or "-imdb_rating"
+        genre = params.genre.lower() if params.genre else None
+
+        if sort == RANKED_SORT and self.rankings is not None:
+            # рейтинг из sorted set-ов ETL: ZREVRANGE + HMGET готовых FilmShort, без ES и без карточек
+            start = (params.page_number - 1) * params.page_size
+            items = await self.rankings.page(genre, start, params.page_size)
+            if items is not None:
+                return codec.join(items)
+
+        async def fetch(block: int) -> Sequence[Dict[str, Any]]:
+            return await self.storage.list_films(
+                sort=sort,
+                page_number=block + 1,
+                page_size=settings.cache.block_size,
+                genre=genre,
+            )
 
-    async def list_films(self, params: FilmsQuery) -> FilmsListResponse:
-        cache_key = f"films:{params.sort}:{params.page_number}:{params.page_size}:{params.genre or 'any'}"
+        return await self._page(
+            # v2 — блоки в формате codec.dump_lines; блоки-массивы старых инстансов с ними не смешиваются
+            f"films:block:v2:{sort}:{genre or 'any'}",
+            fetch,
+            params.page_number,
+            params.page_size,
+            soft_ttl=FILM_CACHE_EXPIRE_IN_SECONDS,
+        )
 
-        # 1) кэш
-        if cached := await self.cache.get(cache_key):
-            data = json.loads(cached)
-            return [FilmShort(**item) for item in data]
+    async def search(self, params: SearchQuery) -> bytes:
+        query = normalize_query(params.query)
 
-        # 2) ES через storage (распаковываем поля из params)
-        docs = await self.storage.list_films(
-            sort=params.sort,
-            page_number=params.page_number,
-            page_size=params.page_size,
-            genre=params.genre,
+        async def fetch(block: int) -> Sequence[Dict[str, Any]]:
+            return await self.storage.search(
+                query=query,
+                page_number=block + 1,
+                page_size=settings.cache.block_size,
+            )
+
+        return await self._page(
+            self.search_block_prefix(query),
+            fetch,
+            params.page_number,
+            params.page_size,
+            soft_ttl=self.search_soft_ttl(),
         )
 
-        items: List[FilmShort] = []
-        for src in docs:
-            es_id = src.get("id")
-            title = src.get("title")
-            rating = src.get("imdb_rating")
-            if not es_id or not title:
-                continue
-            items.append(FilmShort(id=es_id, title=title, imdb_rating=rating))
+    @staticmethod
+    def search_block_prefix(query: str) -> str:
+        """Префикс ключей блоков поиска; query — уже после normalize_query."""
+        return f"films:search:block:v2:{query}"
 
-        # 3) сохранить в кэш
-        if items:
-            await self.cache.set(
-                cache_key,
-                json.dumps([i.dict() for i in items]),
-                ttl=FILM_CACHE_EXPIRE_IN_SECONDS,
-            )
+    @staticmethod
+    def search_soft_ttl() -> int:
+        # мягкий TTL c небольшим «джиттером»
+        return FILM_CACHE_EXPIRE_IN_SECONDS + random.randint(0, 5)
 
-        return items
-       
-    async def search(self, params: SearchQuery) -> FilmsListResponse:
-        cache_key = f"films:search:{params.query}:{params.page_number}:{params.page_size}"
+    async def suggest(self, params: SuggestQuery) -> bytes:
+        """Подсказки по префиксу — JSON-массив FilmSuggestion."""
+        prefix = normalize_query(params.prefix)
+        cache_key = f"films:suggest:{params.size}:{prefix}"
+        if cached := await self.cache.get(cache_key):
+            return cached
 
-        # 1) кэш
-        cached = await self.cache.get(cache_key)
-        if cached:
-            data = json.loads(cached)
-            return [FilmShort(**item) for item in data]
-
-        # 2) storage (ES)
-        docs = await self.storage.search(
-            query=params.query,
-            page_number=params.page_number,
+        docs = await self.storage.suggest(prefix, params.size)
+        raw = codec.dumps([FilmSuggestion(id=d["id"], title=d["title"]) for d in docs if d.get("id")])
+        # короткий TTL: подсказки не сбрасываются по событиям ETL
+        await self.cache.set(cache_key, raw, ttl=settings.cache.suggest_ttl_sec)
+        return raw
+
+    async def list_films_cursor(self, params: FilmsQuery) -> Tuple[bytes, Optional[str]]:
+        """Страница списка по курсору (params.cursor) и курсор следующей.
+
+        Такие страницы не кэшируются: курсор привязан к point in time клиента.
+        """
+        docs, next_cursor = await self.storage.list_films_after(
+            sort=params.sort or "-imdb_rating",
             page_size=params.page_size,
+            cursor=params.cursor,
+            genre=params.genre.lower() if params.genre else None,
         )
+        return codec.dumps(self._short_items(docs)), next_cursor
 
+    async def search_cursor(self, params: SearchQuery) -> Tuple[bytes, Optional[str]]:
+        docs, next_cursor = await self.storage.search_after(
+            query=normalize_query(params.query),
+            page_size=params.page_size,
+            cursor=params.cursor,
+        )
+        return codec.dumps(self._short_items(docs)), next_cursor
+
+    async def _page(
+        self,
+        prefix: str,
+        fetch: Callable[[int], Awaitable[Sequence[Dict[str, Any]]]],
+        page_number: int,
+        page_size: int,
+        soft_ttl: int,
+    ) -> bytes:
+        """Страница, вырезанная из блоков фиксированного размера.
+
+        В кэше лежат блоки по CACHE_BLOCK_SIZE фильмов ({prefix}:{номер блока}),
+        поэтому страницы разного размера по одному запросу делят одни и те же
+        записи кэша и запросы в ES.
+        """
+        block_size = settings.cache.block_size
+        start = (page_number - 1) * page_size
+        first, last = start // block_size, (start + page_size - 1) // block_size
+        # страница не больше MAX_PAGE_SIZE (проверено в модели запроса) — и блоков не больше,
+        # сколько её покрывают: один запрос не превращается в тысячи походов в ES
+        last = min(last, first + -(-MAX_PAGE_SIZE // block_size))
+
+        blocks = await asyncio.gather(*(
+            self._block(f"{prefix}:{b}", lambda b=b: fetch(b), soft_ttl)
+            for b in range(first, last + 1)
+        ))
+        # блоки — JSON элементов по строкам (codec.dump_lines): страница режется и склеивается
+        # как байты, без разбора и gzip; сжимает ответ nginx
+        items = [item for block in blocks if block for item in codec.split_lines(block)]
+        offset = start - first * block_size
+        return codec.join(items[offset:offset + page_size])
+
+    async def _block(
+        self,
+        cache_key: str,
+        fetch: Callable[[], Awaitable[Sequence[Dict[str, Any]]]],
+        soft_ttl: int,
+    ) -> Optional[bytes]:
+        hard_ttl = soft_ttl + settings.cache.stale_grace_sec
+
+        async def load() -> Optional[bytes]:
+            return await self.encode_block(cache_key, await fetch(), hard_ttl)
+
+        # кэш с мягким TTL: после него отдаём старый блок и обновляем его в фоне
+        return await self.swr.get(cache_key, load, soft_ttl=soft_ttl, hard_ttl=hard_ttl)
+
+    async def encode_block(self, cache_key: str, docs: Sequence[Dict[str, Any]], hard_ttl: int) -> Optional[bytes]:
+        """Значение блока для кэша; None — в блоке нет фильмов, кэшировать нечего."""
+        items = self._short_items(docs)
+        if not items:
+            return None
+        # блок сбрасывается, когда ETL переиндексирует любой из его фильмов
+        await self.tags.add(cache_key, [f"film:{i.id}" for i in items], ttl=hard_ttl)
+        return codec.dump_lines(items)
+
+    @staticmethod
+    def _short_items(docs: Sequence[Dict[str, Any]]) -> List[FilmShort]:
         items: List[FilmShort] = []
         for src in docs:
             es_id = src.get("id")
@@ -209,44 +414,83 @@ class FilmService:
             if not es_id or not title:
                 continue
             items.append(FilmShort(id=es_id, title=title, imdb_rating=rating))
-
-        # 3) кэшируем c небольшим «джиттером»
-        if items:
-            payload = json.dumps([i.dict() for i in items])
-            await self.cache.set(
-                cache_key,
-                payload,
-                ttl=FILM_CACHE_EXPIRE_IN_SECONDS + random.randint(0, 5),
-            )
-
         return items
 
-    async def get_by_id(self, film_id: UUID | str) -> Optional[FilmDetail]:
+    async def get_by_id(self, film_id: UUID | str) -> Optional[bytes]:
+        """Карточка фильма — JSON FilmDetail, или None, если фильма нет."""
         fid = str(film_id)
         cache_key = f"film:{fid}"
 
         # 1) кэш
         raw = await self.cache.get(cache_key)
+        if raw == NOT_FOUND:
+            return None
         if raw:
-            return FilmDetail.parse_raw(raw)
+            return raw
 
         # 2) основное хранилище (Elastic через абстракцию)
         doc = await self.storage.get_by_id(fid)  # dict | None
         if not doc:
+            await self.cache.set_not_found(cache_key)
             return None
-        film = FilmDetail(**doc)
+        # валидируем один раз — перед записью в кэш
+        raw = codec.dumps(FilmDetail(**doc))
 
         # 3) положить в кэш и вернуть
-        await self.cache.set(cache_key, film.model_dump_json(), ttl=FILM_CACHE_EXPIRE_IN_SECONDS)
+        await self.cache.set(cache_key, raw, ttl=FILM_CACHE_EXPIRE_IN_SECONDS)
+
+        return raw
+
+    async def get_details(self, film_ids: Sequence[UUID | str]) -> Dict[str, bytes]:
+        """Закэшированные карточки film:{id} по id; ненайденных фильмов в ответе нет.
+
+        Кэш читается одним MGET, промахи добираются одним mget из ES
+        и пишутся обратно одним пайплайном.
+        """
+        unique = list(dict.fromkeys(str(fid) for fid in film_ids))
+        cached = dict(zip(unique, await self.cache.get_many([f"film:{fid}" for fid in unique])))
+        found = {fid: raw for fid, raw in cached.items() if raw is not None and raw != NOT_FOUND}
+
+        if missed := [fid for fid, raw in cached.items() if raw is None]:
+            docs = await self.storage.get_many(missed)
+            # валидируем один раз — перед записью в кэш
+            fresh = {fid: codec.dumps(FilmDetail(**doc)) for fid, doc in docs.items()}
+            await self.cache.set_many(
+                {f"film:{fid}": raw for fid, raw in fresh.items()},
+                ttl=FILM_CACHE_EXPIRE_IN_SECONDS,
+            )
+            await self.cache.set_not_found(*(f"film:{fid}" for fid in missed if fid not in fresh))
+            found.update(fresh)
+        return found
 
-        return film
+    async def get_many(self, film_ids: Sequence[UUID | str]) -> bytes:
+        """Карточки фильмов в порядке запроса — JSON-массив FilmsBatchItem."""
+        ids = [str(fid) for fid in film_ids]
+        found = await self.get_details(ids)
+        # ответ склеивается из закэшированных байтов, без разбора JSON
+        return codec.join([
+            b'{"id":"%s","film":%s}' % (fid.encode(), codec.decompress(found[fid]) if fid in found else b"null")
+            for fid in ids
+        ])
 
 
 @lru_cache()
 def get_film_service(
-    redis: Redis = Depends(get_redis),
+    cache: AbstractCache = Depends(get_cache),
+    swr: StaleWhileRevalidate = Depends(get_swr_cache),
+    tags: CacheTags = Depends(get_cache_tags),
     elastic: AsyncElasticsearch = Depends(get_elastic),
+    rankings: FilmRankings = Depends(get_film_rankings),
 ) -> FilmService:
-    cache: AbstractCache = RedisCache(redis)
-    storage: AbstractDataStorage = ElasticDataStorage(elastic)
-    return FilmService(cache=cache, storage=storage)
+    storage: AbstractDataStorage = (
+        BatchingDataStorage(elastic, get_es_batcher(elastic=elastic))
+        if settings.es.batch_enabled
+        else ElasticDataStorage(elastic)
+    )
+    return FilmService(
+        cache=cache,
+        storage=storage,
+        swr=swr,
+        tags=tags,
+        rankings=rankings if settings.cache.rankings_enabled else None,
+    )
@@ -4,36 +4,41 @@ from uuid import UUID
 
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
-from redis.asyncio import Redis
 
 from db.elastic import get_elastic
-from db.redis import get_redis
 
 from models.genre import Genre
 
 from core.config import settings, Resource
+from services import codec
+from services.cache import NOT_FOUND, AbstractCache, get_cache
 
 
 GENRE_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
 
 class GenreService:
-    def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
-        self.redis = redis
+    def __init__(self, cache: AbstractCache, elastic: AsyncElasticsearch):
+        self.cache = cache
         self.elastic = elastic
         
-    async def get_by_id(self, genre_id: UUID | str) -> Optional[Genre]:
+    async def get_by_id(self, genre_id: UUID | str) -> Optional[bytes]:
+        """Жанр — JSON Genre, или None, если жанра нет."""
         gid = str(genre_id)
         cache_key = f"genre:{gid}"
 
         # 1) cache hit
-        if cached := await self.redis.get(cache_key):
-            return Genre.parse_raw(cached)
+        cached = await self.cache.get(cache_key)
+        if cached == NOT_FOUND:
+            return None
+        if cached:
+            return cached
 
         # 2) из ES
         try:
             index = settings.es.index_for(Resource.genres)
             doc = await self.elastic.get(index=index, id=gid)
         except NotFoundError:
+            await self.cache.set_not_found(cache_key)
             return None
 
         src = doc["_source"]
@@ -43,16 +48,17 @@ class GenreService:
         )
 
         # 3) сохранить в кеш
-        await self.redis.set(cache_key, genre.json(), ex=GENRE_CACHE_EXPIRE_IN_SECONDS)
-        return genre
+        raw = codec.dumps(genre)
+        await self.cache.set(cache_key, raw, ttl=GENRE_CACHE_EXPIRE_IN_SECONDS)
+        return raw
     
-    async def list(self) -> List[Genre]:
+    async def list(self) -> bytes:
+        """Все жанры — JSON-массив Genre."""
         cache_key = "genres:all"
 
         # 1) пробуем из кэша
-        if cached := await self.redis.get(cache_key):
-            import json
-            return [Genre(**item) for item in json.loads(cached)]
+        if cached := await self.cache.get(cache_key):
+            return cached
 
         # 2) берём все жанры из ES
         index = settings.es.index_for(Resource.genres)
@@ -73,14 +79,14 @@ class GenreService:
             items.append(Genre(id=gid, name=name))
 
         # 3) сохраним в кэш
-        import json
-        await self.redis.set(cache_key, json.dumps([g.dict() for g in items]), ex=GENRE_CACHE_EXPIRE_IN_SECONDS)
+        raw = codec.dumps(items)
+        await self.cache.set(cache_key, raw, ttl=GENRE_CACHE_EXPIRE_IN_SECONDS)
 
-        return items
+        return raw
 
 @lru_cache()
 def get_genre_service(
-    redis: Redis = Depends(get_redis),
+    cache: AbstractCache = Depends(get_cache),
     elastic: AsyncElasticsearch = Depends(get_elastic),
 ) -> GenreService:
-    return GenreService(redis, elastic)
\ No newline at end of file
+    return GenreService(cache, elastic)
\ No newline at end of file
@@ -0,0 +1,145 @@
+import asyncio
+import itertools
+import logging
+import statistics
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+
+from elasticsearch import AsyncElasticsearch
+from elastic_transport import ConnectionTimeout
+
+from core import deadline, metrics
+from core.config import settings
+from core.deadline import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# сколько последних задержек учитывать в p95
+LATENCY_WINDOW = 200
+# как часто перечитывать список узлов с данными
+NODES_REFRESH_SEC = 60
+
+
+class HedgedReads:
+    """Хеджирование чтений из Elasticsearch.
+
+    Если запрос не ответил за p95 последних задержек этой операции
+    (но не раньше min_delay_ms), отправляется дубль на другой узел.
+    Берётся первый успешный ответ, второй запрос отменяется. Оба
+    ограничены дедлайном HTTP-запроса (core.deadline): по его
+    истечении — DeadlineExceeded.
+
+    Случайная строка в preference другую копию шарда не гарантирует —
+    копия выбирается по её хэшу. Поэтому основной запрос идёт с
+    _prefer_nodes:<узел> (узлы по очереди), а дубль — с _prefer_nodes
+    на все остальные узлы с данными: если у шарда есть копия не на
+    узле основного запроса, дубль попадёт в неё. Пока узел с данными
+    один (список ведёт watch_nodes), дублировать некуда и дубль не шлётся.
+    """
+
+    def __init__(self, enabled: bool, min_delay_ms: float):
+        self._enabled = enabled
+        self._min_delay = min_delay_ms / 1000
+        self._latencies: dict[str, deque] = {}
+        self._nodes: list[str] = []
+        self._turn = itertools.count()
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+    async def run(self, op: str, call: Callable[[Optional[str]], Awaitable[T]]) -> T:
+        """Результат call(preference); preference=None — обычная маршрутизация ES."""
+        budget = deadline.remaining()
+        if budget is not None and budget <= 0:
+            self.deadline_exceeded += 1
+            raise DeadlineExceeded(f"no time left for {op}")
+
+        primary_preference, hedge_preference = self._preferences()
+        started = time.monotonic()
+        primary = asyncio.ensure_future(call(primary_preference))
+        tasks = {primary}
+        try:
+            delay = self.delay(op)
+            if hedge_preference is not None and (budget is None or delay < budget):
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    tasks.add(asyncio.ensure_future(call(hedge_preference)))
+                    self.hedged += 1
+
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # общий дедлайн (core.singleflight) мог отодвинуться, пока ждали
+                    if (left := deadline.remaining()) is not None and left <= 0:
+                        self.deadline_exceeded += 1
+                        raise DeadlineExceeded(f"{op} did not answer before the request deadline")
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        self._record(op, time.monotonic() - started)
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            if isinstance(error, ConnectionTimeout) and budget is not None:
+                # таймаут запроса к ES урезан дедлайном (ElasticDataStorage._client)
+                self.deadline_exceeded += 1
+                raise DeadlineExceeded(f"{op} did not answer before the request deadline") from error
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _preferences(self) -> Tuple[Optional[str], Optional[str]]:
+        """preference основного запроса и дубля; дубля нет — None вторым элементом."""
+        nodes = self._nodes
+        if not self._enabled or len(nodes) < 2:
+            return None, None
+        node = nodes[next(self._turn) % len(nodes)]
+        others = ",".join(n for n in nodes if n != node)
+        # https://www.elastic.co/guide/en/elasticsearch/reference/current/search-search.html#search-preference
+        return f"_prefer_nodes:{node}", f"_prefer_nodes:{others}"
+
+    async def watch_nodes(self, es: AsyncElasticsearch) -> None:
+        """Держит актуальным список узлов с данными, между которыми разводятся запрос и дубль."""
+        while True:
+            try:
+                resp = await es.nodes.info(filter_path="nodes.*.roles")
+                self._nodes = sorted(
+                    node_id
+                    for node_id, node in resp.body.get("nodes", {}).items()
+                    if any(role.startswith("data") for role in node.get("roles", []))
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Не удалось получить список узлов Elasticsearch: {e}")
+            await asyncio.sleep(NODES_REFRESH_SEC)
+
+    def delay(self, op: str) -> float:
+        samples = self._latencies.get(op)
+        if not samples or len(samples) < 20:
+            return self._min_delay
+        return max(self._min_delay, statistics.quantiles(samples, n=20)[-1])
+
+    def _record(self, op: str, latency: float) -> None:
+        self._latencies.setdefault(op, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def stats(self) -> dict:
+        return {
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+            "data_nodes": len(self._nodes),
+            "delay_ms": {op: round(self.delay(op) * 1000, 1) for op in self._latencies},
+        }
+
+
+hedged_reads = HedgedReads(enabled=settings.es.hedge_enabled, min_delay_ms=settings.es.hedge_min_delay_ms)
+metrics.register("es_hedging", hedged_reads.stats)
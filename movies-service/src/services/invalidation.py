@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from core import metrics
+from core.config import settings
+from services.cache import AbstractCache, CacheTags
+
+logger = logging.getLogger(__name__)
+
+
+class IndexEventsConsumer:
+    """Сбрасывает кэш по событиям ETL о переиндексированных документах.
+
+    ETL после каждой пачки кладёт в Redis Stream событие {index, ids}.
+    Инстансы сервиса читают поток одной группой потребителей: каждое событие
+    обрабатывает ровно один инстанс, а локальные копии у остальных сбрасывает
+    TieredCache через канал инвалидации. Событие подтверждается (XACK) только
+    после удаления ключей; зависшие у упавшего инстанса забираются XAUTOCLAIM.
+    """
+
+    def __init__(self, cache: AbstractCache, tags: CacheTags, stream: str, group: str, claim_idle_ms: int):
+        self._cache = cache
+        self._tags = tags
+        self._stream = stream
+        self._group = group
+        self._claim_idle_ms = claim_idle_ms
+        self._consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.events = 0
+        self.evicted = 0
+
+    async def run(self, r: Redis) -> None:
+        group_ready = False
+        while True:
+            try:
+                # группу создаём один раз, а заново — только если её удалили (или поток) — NOGROUP
+                if not group_ready:
+                    await self._ensure_group(r)
+                    group_ready = True
+                await self._claim_stale(r)
+                response = await r.xreadgroup(
+                    self._group, self._consumer, {self._stream: ">"}, count=100, block=5000
+                )
+                for _, entries in response or []:
+                    await self._handle(r, entries)
+            except asyncio.CancelledError:
+                raise
+            except ResponseError as e:
+                if "NOGROUP" in str(e):
+                    group_ready = False
+                logger.error(f"Не удалось обработать события индексации: {e}")
+                await asyncio.sleep(1)
+            except Exception as e:
+                logger.error(f"Не удалось обработать события индексации: {e}")
+                await asyncio.sleep(1)
+
+    async def _ensure_group(self, r: Redis) -> None:
+        try:
+            await r.xgroup_create(self._stream, self._group, id="$", mkstream=True)
+        except ResponseError as e:
+            # группа уже есть — это нормально
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _claim_stale(self, r: Redis) -> None:
+        _, entries, *_ = await r.xautoclaim(
+            self._stream, self._group, self._consumer, min_idle_time=self._claim_idle_ms, count=100
+        )
+        await self._handle(r, entries)
+
+    async def _handle(self, r: Redis, entries: list) -> None:
+        for entry_id, fields in entries:
+            if fields:
+                fields = {_decode(k): _decode(v) for k, v in fields.items()}
+                keys = await self.keys_for(fields.get("index"), json.loads(fields.get("ids") or "[]"))
+                await self._cache.delete_many(keys)
+                self.events += 1
+                self.evicted += len(keys)
+            await r.xack(self._stream, self._group, entry_id)
+
+    async def keys_for(self, index: str | None, ids: list[str]) -> set[str]:
+        """Ключи кэша, которые затрагивает переиндексация документов ids в индексе index."""
+        if index == settings.es.films_index:
+            keys = {f"film:{i}" for i in ids}
+            return keys | await self._tags.pop_keys(f"film:{i}" for i in ids)
+        if index == settings.es.persons_index:
+            keys = {f"person:detail:{i}" for i in ids}
+            return keys | await self._tags.pop_keys(f"person:{i}" for i in ids)
+        if index == settings.es.genres_index:
+            return {f"genre:{i}" for i in ids} | {"genres:all"}
+        return set()
+
+    def stats(self) -> dict:
+        return {"consumer": self._consumer, "events": self.events, "evicted": self.evicted}
+
+
+def create_consumer(cache: AbstractCache, tags: CacheTags) -> IndexEventsConsumer:
+    consumer = IndexEventsConsumer(
+        cache,
+        tags,
+        stream=settings.cache.events_stream,
+        group=settings.cache.events_group,
+        claim_idle_ms=settings.cache.events_claim_idle_ms,
+    )
+    metrics.register("index_events", consumer.stats)
+    return consumer
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, (bytes, bytearray)) else value
@@ -1,39 +1,59 @@
-import json
 import random
 
 from functools import lru_cache
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from uuid import UUID
 
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
-from redis.asyncio import Redis
 
 from db.elastic import get_elastic
-from db.redis import get_redis
-from models.person import PersonDetail, PersonFilmRole, PersonFilm, PersonSearchItem, PersonSearchFilm
-from models.film import SearchQuery
+from models.person import (
+    PersonDetail, PersonFilmRole, PersonFilm, PersonSearchItem, PersonSearchFilm, PersonSuggestion,
+)
+from models.film import SearchQuery, SuggestQuery
 
 from core.config import settings, Resource
+from services import codec
+from services.cursor import search_page
+from services.cache import (
+    NOT_FOUND, AbstractCache, CacheTags, StaleWhileRevalidate, get_cache, get_cache_tags, get_swr_cache,
+)
+from services.film import FilmService, get_film_service, normalize_query
 
 PERSON_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
 
 class PersonService:
-    def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
-        self.redis = redis
+    def __init__(
+        self,
+        cache: AbstractCache,
+        elastic: AsyncElasticsearch,
+        swr: StaleWhileRevalidate,
+        tags: CacheTags,
+        films: FilmService,
+    ):
+        self.cache = cache
         self.elastic = elastic
+        self.swr = swr
+        self.tags = tags
+        self.films = films
 
-    async def get_by_id(self, person_id: UUID | str) -> Optional[PersonDetail]:
+    async def get_by_id(self, person_id: UUID | str) -> Optional[bytes]:
+        """Карточка персоны — JSON PersonDetail, или None, если персоны нет."""
         pid = str(person_id)
         cache_key = f"person:detail:{pid}"
 
-        if data := await self.redis.get(cache_key):
-            return PersonDetail.parse_raw(data)
+        data = await self.cache.get(cache_key)
+        if data == NOT_FOUND:
+            return None
+        if data:
+            return data
 
         try:
             index = settings.es.index_for(Resource.persons)
             doc = await self.elastic.get(index=index, id=pid)
         except NotFoundError:
+            await self.cache.set_not_found(cache_key)
             return None
 
         src = doc["_source"]
@@ -49,99 +69,130 @@ class PersonService:
             films=films,
         )
 
-        await self.redis.set(cache_key, person.json(), ex=PERSON_CACHE_EXPIRE_IN_SECONDS)
-        return person
+        raw = codec.dumps(person)
+        await self.cache.set(cache_key, raw, ttl=PERSON_CACHE_EXPIRE_IN_SECONDS)
+        return raw
     
-    async def get_person_films(self, person_id: UUID | str) -> List[PersonFilm]:
-        pid = str(person_id)
-        cache_key = f"person:films:{pid}"
-
-        # 1. Пробуем достать из кеша
-        cached = await self.redis.get(cache_key)
-        if cached:
-            data = json.loads(cached)
-            return [PersonFilm(**item) for item in data]
-
-        # 2. Берём документ персоны из ES
-        try:
-            index = settings.es.index_for(Resource.persons)
-            doc = await self.elastic.get(index=index, id=pid)
-        except NotFoundError:
-            await self.redis.set(cache_key, "[]", ex=PERSON_CACHE_EXPIRE_IN_SECONDS)
-            return []
-
-        source = doc.get("_source", {})
-        films_data = source.get("films", [])
-
-        # 3. Собираем id фильмов
-        film_ids: List[str] = []
-        for item in films_data:
-            fid = item.get("id")
-            if fid:
-                film_ids.append(fid)
-
+    async def get_person_films(self, person_id: UUID | str) -> bytes:
+        """Фильмы персоны — JSON-массив PersonFilm.
+
+        Собирается из общих записей кэша: person:detail:{id} даёт список
+        фильмов, film:{id} — их карточки (одним MGET, промахи — одним mget
+        из ES). Отдельного ключа со списком фильмов персоны нет, поэтому он
+        не дублирует карточки и не устаревает отдельно от них.
+        """
+        person = await self.get_by_id(person_id)
+        if not person:
+            return codec.EMPTY_LIST
+
+        film_ids = [f["id"] for f in codec.loads(person).get("films", []) if f.get("id")]
         if not film_ids:
-            await self.redis.set(cache_key, "[]", ex=PERSON_CACHE_EXPIRE_IN_SECONDS)
-            return []
-
-        # 4. mget фильмов
-        index = settings.es.index_for(Resource.films)
-        resp = await self.elastic.mget(index=index, body={"ids": film_ids})
+            return codec.EMPTY_LIST
 
+        details = await self.films.get_details(film_ids)
         result: List[PersonFilm] = []
-        for d in resp.get("docs", []):
-            if not d.get("found"):
+        for fid in dict.fromkeys(film_ids):
+            if (raw := details.get(fid)) is None:
                 continue
-            src = d.get("_source", {})
+            film = codec.loads(raw)
             result.append(
                 PersonFilm(
-                    id=src.get("id"),
-                    title=src.get("title", ""),
-                    imdb_rating=src.get("imdb_rating"),
+                    id=film["id"],
+                    title=film.get("title", ""),
+                    imdb_rating=film.get("imdb_rating"),
                 )
             )
-
-        # 5. Сохраняем в кеш
-        await self.redis.set(
-            cache_key,
-            json.dumps([film.dict() for film in result]),
-            ex=PERSON_CACHE_EXPIRE_IN_SECONDS,
-        )
-        return result
+        return codec.dumps(result)
     
-    async def search(self, params: SearchQuery) -> List[PersonSearchItem]:
-        cache_key = f"persons:search:{params.query}:{params.page_number}:{params.page_size}"
+    async def search(self, params: SearchQuery) -> bytes:
+        """Страница поиска персон — JSON-массив PersonSearchItem."""
+        cache_key = self.search_key(params)
+        # мягкий TTL (+ небольшой «джиттер»): устаревшая выдача обновляется в фоне
+        soft_ttl = self.search_soft_ttl()
+        hard_ttl = soft_ttl + settings.cache.stale_grace_sec
+
+        async def load() -> Optional[bytes]:
+            from_ = (params.page_number - 1) * params.page_size
+
+            index = settings.es.index_for(Resource.persons)
+            resp = await self.elastic.search(
+                index=index,
+                query=self.search_query(params.query),
+                from_=from_,
+                size=params.page_size,
+            )
 
-        # 1) пробуем из кеша
-        cached = await self.redis.get(cache_key)
-        if cached:
-            data = json.loads(cached)
-            return [PersonSearchItem(**item) for item in data]
+            hits = resp.get("hits", {}).get("hits", [])
+            return await self.encode_search_page(cache_key, [h.get("_source", {}) or {} for h in hits], hard_ttl)
 
-        from_ = (params.page_number - 1) * params.page_size
+        return await self.swr.get(cache_key, load, soft_ttl=soft_ttl, hard_ttl=hard_ttl)
 
-        es_query = {
+    @staticmethod
+    def search_key(params: SearchQuery) -> str:
+        return f"persons:search:{params.query}:{params.page_number}:{params.page_size}"
+
+    @staticmethod
+    def search_soft_ttl() -> int:
+        return PERSON_CACHE_EXPIRE_IN_SECONDS + random.randint(0, 5)
+
+    async def encode_search_page(self, cache_key: str, docs: List[dict], hard_ttl: int) -> bytes:
+        """Значение страницы поиска для кэша из документов индекса персон."""
+        items = self._search_items(docs)
+        await self.tags.add(cache_key, [f"person:{i.id}" for i in items], ttl=hard_ttl)
+        return codec.dumps(items)
+
+    async def search_cursor(self, params: SearchQuery) -> Tuple[bytes, Optional[str]]:
+        """Страница поиска по курсору (params.cursor) и курсор следующей; не кэшируется."""
+        docs, next_cursor = await search_page(
+            self.elastic,
+            settings.es.index_for(Resource.persons),
+            query=self.search_query(params.query),
+            sort=[{"_score": {"order": "desc"}}],
+            size=params.page_size,
+            cursor=params.cursor,
+        )
+        return codec.dumps(self._search_items(docs)), next_cursor
+
+    async def suggest(self, params: SuggestQuery) -> bytes:
+        """Подсказки по префиксу имени — JSON-массив PersonSuggestion."""
+        prefix = normalize_query(params.prefix)
+        cache_key = f"persons:suggest:{params.size}:{prefix}"
+        if cached := await self.cache.get(cache_key):
+            return cached
+
+        resp = await self.elastic.search(
+            index=settings.es.index_for(Resource.persons),
+            suggest={
+                "persons": {
+                    "prefix": prefix,
+                    "completion": {"field": "full_name_suggest", "size": params.size, "skip_duplicates": True},
+                }
+            },
+            source=["id", "full_name"],
+        )
+        options = resp["suggest"]["persons"][0]["options"]
+        raw = codec.dumps([
+            PersonSuggestion(id=o["_source"]["id"], full_name=o["_source"]["full_name"])
+            for o in options if o["_source"].get("id")
+        ])
+        await self.cache.set(cache_key, raw, ttl=settings.cache.suggest_ttl_sec)
+        return raw
+
+    @staticmethod
+    def search_query(query: str) -> dict:
+        return {
             "match": {
                 "full_name": {
-                    "query": params.query,
+                    "query": query,
                     "operator": "and"
                 }
             }
         }
 
-        index = settings.es.index_for(Resource.persons)
-        resp = await self.elastic.search(
-            index=index,
-            query=es_query,
-            from_=from_,
-            size=params.page_size,
-        )
-
-        hits = resp.get("hits", {}).get("hits", [])
+    @staticmethod
+    def _search_items(docs: List[dict]) -> List[PersonSearchItem]:
         items: List[PersonSearchItem] = []
-
-        for h in hits:
-            src = h.get("_source", {}) or {}
+        for src in docs:
             pid = src.get("id")
             full_name = src.get("full_name")
             if not pid or not full_name:
@@ -155,17 +206,14 @@ class PersonService:
                 films.append(PersonSearchFilm(id=fid, roles=f.get("roles", [])))
 
             items.append(PersonSearchItem(id=pid, full_name=full_name, films=films))
-
-        # --- 3) кладём в кэш ---
-        if self.redis:
-            payload = json.dumps([i.model_dump(mode="json") for i in items])
-            await self.redis.set(cache_key, payload, ex=PERSON_CACHE_EXPIRE_IN_SECONDS+random.randint(0, 5))
-
         return items
 
 @lru_cache()
 def get_person_service(
-        redis: Redis = Depends(get_redis),
+        cache: AbstractCache = Depends(get_cache),
+        swr: StaleWhileRevalidate = Depends(get_swr_cache),
+        tags: CacheTags = Depends(get_cache_tags),
+        films: FilmService = Depends(get_film_service),
         elastic: AsyncElasticsearch = Depends(get_elastic),
 ) -> PersonService:
-    return PersonService(redis, elastic)
\ No newline at end of file
+    return PersonService(cache, elastic, swr, tags, films)
\ No newline at end of file
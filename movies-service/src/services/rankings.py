@@ -0,0 +1,103 @@
+"""Рейтинги фильмов, которые ETL держит в sorted set-ах Redis.
+
+ETL (etl/core/rankings.py) обновляет {prefix}:all и {prefix}:genre:{id}
+со score = imdb_rating после каждой загрузки фильмов в ES, а в хэше
+{prefix}:short держит JSON FilmShort каждого фильма. Список с сортировкой
+-imdb_rating — это ZREVRANGE по нужному набору и HMGET по хэшу одним
+скриптом: страница склеивается из готовых байтов, без карточек film:{id}
+и без разбора JSON.
+
+Наборы читаются, только если ready называет текущий индекс фильмов
+(его uuid сервис перечитывает из ES в watch_index): пересозданный индекс
+отдаётся из ES, пока ETL не соберёт наборы заново.
+"""
+import asyncio
+import logging
+from functools import lru_cache
+from typing import List, Optional
+
+from elasticsearch import AsyncElasticsearch, NotFoundError
+from fastapi import Depends
+from redis.asyncio import Redis
+
+from core import metrics
+from core.config import settings
+from db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# единственная сортировка, которую покрывают наборы
+RANKED_SORT = "-imdb_rating"
+# формат наборов, который понимает сервис (READY_VERSION в ETL)
+READY_VERSION = "2"
+# как часто перечитывать uuid индекса фильмов
+INDEX_REFRESH_SEC = 30
+
+# страница рейтинга за один поход в Redis; false — наборы не готовы или не из текущего индекса,
+# набор пропал (вытеснен), а ready остался — тоже false
+RANKED_PAGE = """
+if redis.call('get', KEYS[1]) ~= ARGV[1] or redis.call('exists', KEYS[2]) == 0 then
+    return false
+end
+local ids = redis.call('zrevrange', KEYS[2], ARGV[2], ARGV[3])
+if #ids == 0 then
+    return {}
+end
+return redis.call('hmget', KEYS[3], unpack(ids))
+"""
+
+
+class FilmRankings:
+    def __init__(self, client: Redis, prefix: str):
+        self._prefix = prefix
+        self._page = client.register_script(RANKED_PAGE)
+        # ожидаемое значение ready: версия и uuid текущего индекса; None — uuid ещё неизвестен
+        self._ready: Optional[str] = None
+        self.hits = 0
+        self.fallbacks = 0
+
+    async def page(self, genre: Optional[str], start: int, size: int) -> Optional[List[bytes]]:
+        """JSON FilmShort фильмов с позиции start по убыванию рейтинга.
+
+        None — наборы ещё не собраны ETL из текущего индекса целиком
+        (или не сходятся с хэшем), страницу нужно взять из ES.
+        """
+        if self._ready is None:
+            self.fallbacks += 1
+            return None
+        key = f"{self._prefix}:genre:{genre}" if genre else f"{self._prefix}:all"
+        # https://redis.io/commands/zrevrange/
+        items = await self._page(
+            keys=[f"{self._prefix}:ready", key, f"{self._prefix}:short"],
+            args=[self._ready, start, start + size - 1],
+        )
+        if items is None or None in items:
+            self.fallbacks += 1
+            return None
+        self.hits += 1
+        return items
+
+    async def watch_index(self, es: AsyncElasticsearch, index: str) -> None:
+        """Держит актуальным uuid индекса фильмов, из которого должны быть собраны наборы."""
+        while True:
+            try:
+                resp = await es.indices.get_settings(index=index, name="index.uuid")
+                (index_settings,) = resp.body.values()
+                self._ready = f"{READY_VERSION}:{index_settings['settings']['index']['uuid']}"
+            except asyncio.CancelledError:
+                raise
+            except NotFoundError:
+                self._ready = None
+            except Exception as e:
+                logger.warning(f"Не удалось получить uuid индекса '{index}': {e}")
+            await asyncio.sleep(INDEX_REFRESH_SEC)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "fallbacks": self.fallbacks, "index_known": self._ready is not None}
+
+
+@lru_cache()
+def get_film_rankings(redis: Redis = Depends(get_redis)) -> FilmRankings:
+    rankings = FilmRankings(redis, settings.cache.rankings_prefix)
+    metrics.register("film_rankings", rankings.stats)
+    return rankings
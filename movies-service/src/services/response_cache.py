@@ -0,0 +1,58 @@
+"""Готовые тела ответов GET-ручек в памяти процесса.
+
+Сервисы уже отдают JSON-байты, но страница, вырезанная из блоков, список
+фильмов персоны или рейтинг из sorted set-ов собираются заново на каждый
+запрос (разбор блоков, MGET карточек, сериализация). Здесь лежит итоговое
+тело ответа по ручке и нормализованным параметрам: повторный запрос не
+выходит из процесса и ничего не разбирает.
+
+Инвалидации по событиям нет — ответ живёт CACHE_RESPONSE_TTL_SEC секунд
+(по умолчанию несколько секунд), этого хватает, чтобы снять нагрузку
+с горячих ручек и не держать устаревшую выдачу дольше записей под ней.
+"""
+from typing import Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+from core import metrics
+from core.config import settings
+from core.singleflight import SingleFlight
+from services.cache import LocalCache
+
+
+class ResponseCache:
+    def __init__(self, max_size: int, ttl: int):
+        self._local = LocalCache(max_size=max_size, ttl=ttl)
+        self._flights = SingleFlight()
+
+    @staticmethod
+    def key(route: str, *parts: BaseModel | str) -> str:
+        """Ключ по имени ручки, path-параметрам и провалидированной модели query-параметров.
+
+        Модель уже нормализует параметры (значения по умолчанию, типы),
+        поэтому ?page_size=050 и ?page_size=50 дают один ключ.
+        """
+        return ":".join([
+            f"response:{route}",
+            *(p.model_dump_json() if isinstance(p, BaseModel) else str(p) for p in parts),
+        ])
+
+    async def get(self, key: str, build: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        """Тело ответа из кэша или от build; None (например, 404) не кэшируется."""
+        if (body := self._local.get(key)) is not None:
+            return body
+        # одновременные промахи по ключу собирают ответ один раз
+        return await self._flights.do(key, lambda: self._build(key, build))
+
+    async def _build(self, key: str, build: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        body = await build()
+        if body is not None:
+            self._local.set(key, body)
+        return body
+
+    def stats(self) -> dict:
+        return {**self._local.stats(), "coalesced": self._flights.shared}
+
+
+response_cache = ResponseCache(max_size=settings.cache.response_max_size, ttl=settings.cache.response_ttl_sec)
+metrics.register("response_cache", response_cache.stats)
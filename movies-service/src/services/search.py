@@ -0,0 +1,130 @@
+"""Общий поиск по фильмам и персонам.
+
+Выдача складывается из тех же записей кэша, что и у /films/search и
+/persons/search: первый блок поиска фильмов и первая страница поиска
+персон читаются одним MGET, а промахи догружаются одним _msearch —
+один поход в ES вместо двух последовательных. Пересчёт промахов идёт
+через StaleWhileRevalidate с арендой, как у блоков /films/search.
+"""
+import asyncio
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends
+
+from core.config import settings, Resource
+from db.elastic import get_elastic
+from models.film import SearchQuery
+from models.search import UnifiedSearchQuery
+from services import codec
+from services.batching import BatchItemError
+from services.cache import StaleWhileRevalidate, get_swr_cache
+from services.film import SHORT_SOURCE, ElasticDataStorage, FilmService, get_film_service, normalize_query
+from services.person import PersonService, get_person_service
+
+
+class SearchService:
+    def __init__(
+        self,
+        swr: StaleWhileRevalidate,
+        elastic: AsyncElasticsearch,
+        films: FilmService,
+        persons: PersonService,
+    ):
+        self.swr = swr
+        self.elastic = elastic
+        self.films = films
+        self.persons = persons
+
+    async def search(self, params: UnifiedSearchQuery) -> bytes:
+        """Фильмы и персоны по запросу — JSON SearchResponse."""
+        film_query = normalize_query(params.query)
+        film_key = f"{self.films.search_block_prefix(film_query)}:0"
+        film_soft_ttl = self.films.search_soft_ttl()
+        person_params = SearchQuery(query=params.query, page_size=params.size)
+        person_key = self.persons.search_key(person_params)
+        person_soft_ttl = self.persons.search_soft_ttl()
+        grace = settings.cache.stale_grace_sec
+
+        films, persons = await self.swr.get_many([film_key, person_key])
+        if films is None or persons is None:
+            searches: Dict[str, List[Dict[str, Any]]] = {}
+            if films is None:
+                searches[film_key] = [
+                    {"index": settings.es.index_for(Resource.films)},
+                    {
+                        "query": ElasticDataStorage.search_query(film_query),
+                        # блок целиком — его переиспользует /films/search
+                        "size": settings.cache.block_size,
+                        "_source": SHORT_SOURCE,
+                        "track_total_hits": False,
+                    },
+                ]
+            if persons is None:
+                searches[person_key] = [
+                    {"index": settings.es.index_for(Resource.persons)},
+                    {"query": PersonService.search_query(params.query), "size": params.size},
+                ]
+            batch: Optional[asyncio.Task] = None
+
+            async def docs(key: str) -> List[Dict[str, Any]]:
+                # промахи обоих ключей — один _msearch: его запускает первый пересчёт, второй ждёт тот же ответ
+                nonlocal batch
+                if batch is None:
+                    batch = asyncio.ensure_future(self._msearch(searches))
+                return self._docs((await asyncio.shield(batch))[key])
+
+            async def load_films() -> Optional[bytes]:
+                return await self.films.encode_block(film_key, await docs(film_key), film_soft_ttl + grace)
+
+            async def load_persons() -> bytes:
+                hard_ttl = person_soft_ttl + grace
+                return await self.persons.encode_search_page(person_key, await docs(person_key), hard_ttl)
+
+            # промахи идут через SWR с арендой, как блоки /films/search: холодный запрос
+            # пересчитывает ключ один раз на все инстансы, остальные ждут его результат
+            films, persons = await asyncio.gather(
+                self._get(films, film_key, load_films, film_soft_ttl),
+                self._get(persons, person_key, load_persons, person_soft_ttl),
+            )
+
+        # ответ склеивается из закэшированных байтов; блок режется без разбора (codec.dump_lines)
+        films = codec.join(codec.split_lines(films)[:params.size]) if films else codec.EMPTY_LIST
+        return b'{"films":%s,"persons":%s}' % (films, codec.decompress(persons))
+
+    async def _get(
+        self,
+        value: Optional[bytes],
+        key: str,
+        load: Callable[[], Awaitable[Optional[bytes]]],
+        soft_ttl: int,
+    ) -> Optional[bytes]:
+        if value is not None:
+            return value
+        return await self.swr.get(key, load, soft_ttl=soft_ttl, hard_ttl=soft_ttl + settings.cache.stale_grace_sec)
+
+    async def _msearch(self, searches: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """Ответы _msearch по ключам кэша, для которых шли поиски."""
+        # request_cache задаётся на весь _msearch, а не на отдельный поиск
+        resp = await ElasticDataStorage.deadline_client(self.elastic).msearch(
+            searches=[part for pair in searches.values() for part in pair],
+            request_cache=True,
+        )
+        return dict(zip(searches, resp["responses"]))
+
+    @staticmethod
+    def _docs(item: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if "error" in item:
+            raise BatchItemError(item.get("status"), item["error"])
+        return [hit.get("_source", {}) or {} for hit in item["hits"]["hits"]]
+
+
+@lru_cache()
+def get_search_service(
+    swr: StaleWhileRevalidate = Depends(get_swr_cache),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+    films: FilmService = Depends(get_film_service),
+    persons: PersonService = Depends(get_person_service),
+) -> SearchService:
+    return SearchService(swr, elastic, films, persons)
@@ -0,0 +1,200 @@
+"""Прогрев кэша.
+
+Запускается в фоне при старте сервиса (CACHE_WARMUP_ENABLED), вручную —
+через POST /internal/cache/warmup (токен с ролью admin) или из консоли контейнера:
+
+    python -m services.warmup
+"""
+import asyncio
+import logging
+import time
+import uuid
+from functools import lru_cache
+from typing import Awaitable, Optional
+
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends
+from redis.asyncio import Redis
+
+from core import deadline, metrics
+from core.config import settings
+from db.elastic import get_elastic
+from db.redis import get_redis
+from models.film import MAX_PAGE_SIZE, FilmsQuery
+from services import codec
+from services.cache import RELEASE_LEASE, get_cache, get_cache_tags, get_swr_cache
+from services.film import FilmService, get_film_service
+from services.genre import GenreService, get_genre_service
+from services.rankings import get_film_rankings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """Заполняет самые запрашиваемые ключи: genres:all, первые страницы
+    list_films для каждого жанра и сортировки и карточки film:{id} топа.
+
+    Запросы в ES идут не больше чем по concurrency одновременно. Из всех
+    инстансов прогрев выполняет один — тот, что взял блокировку в Redis.
+    """
+
+    LOCK_KEY = "cache:warmup:lock"
+    LOCK_TTL_SEC = 600
+
+    def __init__(
+        self,
+        films: FilmService,
+        genres: GenreService,
+        client: Redis,
+        concurrency: int,
+        pages: int,
+        sorts: list[str],
+        top_films: int,
+    ):
+        self._films = films
+        self._genres = genres
+        self._client = client
+        self._release = client.register_script(RELEASE_LEASE)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pages = pages
+        self._sorts = sorts
+        self._top_films = top_films
+        self.state = "idle"
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.duration_sec: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    async def run(self) -> None:
+        if self.running:
+            return
+        # запуск из ручки наследует дедлайн запроса — прогреву он не нужен
+        deadline.clear()
+        token = uuid.uuid4().hex
+        if not await self._client.set(self.LOCK_KEY, token, nx=True, ex=self.LOCK_TTL_SEC):
+            logger.info("Прогрев кэша уже выполняет другой инстанс")
+            self.state = "skipped"
+            return
+
+        self.state = "running"
+        self.total = self.done = self.failed = 0
+        self.started_at = time.time()
+        self.duration_sec = None
+        try:
+            await self._warm()
+            self.state = "done"
+        except Exception as e:
+            logger.error(f"Прогрев кэша прерван: {e}")
+            self.state = "failed"
+        finally:
+            # отмена тоже сюда: блокировку освобождаем в любом случае
+            if self.state == "running":
+                self.state = "cancelled"
+            self.duration_sec = round(time.time() - self.started_at, 3)
+            # только свою: если прогрев шёл дольше LOCK_TTL_SEC, блокировку мог взять другой инстанс
+            await self._release(keys=[self.LOCK_KEY], args=[token])
+            logger.info(
+                f"Прогрев кэша: {self.state}, {self.done}/{self.total} ключей, "
+                f"ошибок {self.failed}, {self.duration_sec} с"
+            )
+
+    async def _warm(self) -> None:
+        self.total = 1
+        genres = codec.loads(await self._step(self._genres.list()))
+
+        queries = [
+            FilmsQuery(sort=sort, page_number=page, genre=genre)
+            for genre in [None, *(g["id"] for g in genres)]
+            for sort in self._sorts
+            for page in range(1, self._pages + 1)
+        ]
+        # топ — страницами не больше MAX_PAGE_SIZE: список и карточки страницы — два шага
+        top_page_size = min(self._top_films, MAX_PAGE_SIZE)
+        top_pages = -(-self._top_films // top_page_size) if top_page_size > 0 else 0
+        self.total += len(queries) + 2 * top_pages
+        logger.info(f"Прогрев кэша: {len(genres)} жанров, {len(queries)} страниц списков")
+        await asyncio.gather(*(self._step(self._films.list_films(q)) for q in queries))
+        await asyncio.gather(*(self._warm_top(page, top_page_size) for page in range(1, top_pages + 1)))
+
+    async def _warm_top(self, page_number: int, page_size: int) -> None:
+        query = FilmsQuery(sort="-imdb_rating", page_number=page_number, page_size=page_size)
+        top = codec.loads(await self._step(self._films.list_films(query)))
+        # последняя страница может выйти за CACHE_WARMUP_TOP_FILMS
+        top = top[:self._top_films - (page_number - 1) * page_size]
+        # карточки страницы — одним пакетом (MGET + ES mget)
+        await self._step(self._films.get_many([f["id"] for f in top]))
+
+    async def _step(self, job: Awaitable[bytes]) -> bytes:
+        async with self._semaphore:
+            try:
+                return await job
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Прогрев кэша: шаг не выполнен: {e}")
+                return codec.EMPTY_LIST
+            finally:
+                self.done += 1
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "started_at": self.started_at,
+            "duration_sec": self.duration_sec,
+        }
+
+
+@lru_cache()
+def get_cache_warmer(
+    redis: Redis = Depends(get_redis),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+) -> CacheWarmer:
+    cache = get_cache(redis=redis)
+    films = get_film_service(
+        cache=cache,
+        swr=get_swr_cache(cache=cache, redis=redis),
+        tags=get_cache_tags(redis=redis),
+        elastic=elastic,
+        rankings=get_film_rankings(redis=redis),
+    )
+    warmer = CacheWarmer(
+        films=films,
+        genres=get_genre_service(cache=cache, elastic=elastic),
+        client=redis,
+        concurrency=settings.cache.warmup_concurrency,
+        pages=settings.cache.warmup_pages,
+        sorts=settings.cache.warmup_sorts,
+        top_films=settings.cache.warmup_top_films,
+    )
+    metrics.register("warmup", warmer.stats)
+    return warmer
+
+
+async def main() -> None:
+    redis_client = Redis(host=settings.redis.host, port=settings.redis.port)
+    es = AsyncElasticsearch(
+        hosts=[f'{settings.es.protocol}://{settings.es.host}:{settings.es.port}'],
+        request_timeout=settings.es.request_timeout_sec,
+        max_retries=settings.es.max_retries,
+        retry_on_timeout=True,
+    )
+    try:
+        warmer = get_cache_warmer(redis=redis_client, elastic=es)
+        await warmer.run()
+        print(warmer.stats())
+    finally:
+        await redis_client.close()
+        await es.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
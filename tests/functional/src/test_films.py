@@ -1,6 +1,11 @@
+import asyncio
+import uuid
+
 import pytest
 from http import HTTPStatus
 
+from tests.functional.settings import test_settings
+
 # --- Тесты поиска фильмов ---
 @pytest.mark.parametrize(
     "query, expected_status, expected_count",
@@ -45,6 +50,34 @@ async def test_film_details(make_raw_get_request, film_id, expected_status):
         assert body["id"] == film_id
 
 
+
+async def test_search_short_deadline_does_not_fail_coalesced_request(session):
+    # холодный ключ: оба запроса схлопываются в один поиск в ES
+    url = test_settings.service_url + "/api/v1/films/search"
+    params = {"query": f"star {uuid.uuid4().hex}"}
+
+    async def get(headers: dict) -> int:
+        async with session.get(url, params=params, headers=headers) as response:
+            return response.status
+
+    short, normal = await asyncio.gather(get({"X-Request-Timeout-Ms": "1"}), get({}))
+    assert short == HTTPStatus.GATEWAY_TIMEOUT
+    assert normal == HTTPStatus.OK
+
+
+async def test_film_details_not_modified(session):
+    url = test_settings.service_url + "/api/v1/films/ff750819-6004-426b-ae66-19a3ba15adcc"
+    async with session.get(url) as first:
+        assert first.status == HTTPStatus.OK
+        etag = first.headers["ETag"]
+        assert "max-age=" in first.headers["Cache-Control"]
+
+    async with session.get(url, headers={"If-None-Match": etag}) as second:
+        assert second.status == HTTPStatus.NOT_MODIFIED
+        assert second.headers["ETag"] == etag
+        assert await second.read() == b""
+
+
 # --- Тесты списка фильмов по жанрам и сортировке ---
 @pytest.mark.parametrize(
     "params, expected_status, min_count",
@@ -52,6 +85,9 @@ async def test_film_details(make_raw_get_request, film_id, expected_status):
         ({"genre": "f39d7b6d-aef2-40b1-aaf0-cf05e7048011"}, HTTPStatus.OK, 1),  # реальный ID жанра
         ({"sort": "-imdb_rating", "page_size": 5}, HTTPStatus.OK, 1),
         ({"page_number": 0}, HTTPStatus.UNPROCESSABLE_ENTITY, None),
+        ({"page_size": 1001}, HTTPStatus.UNPROCESSABLE_ENTITY, None),
+        ({"page_number": 200, "page_size": 50}, HTTPStatus.OK, 0),  # на границе окна ES
+        ({"page_number": 201, "page_size": 50}, HTTPStatus.UNPROCESSABLE_ENTITY, None),
     ],
 )
 async def test_films_list(make_raw_get_request, params, expected_status, min_count):
@@ -66,3 +102,67 @@ async def test_films_list(make_raw_get_request, params, expected_status, min_cou
             assert "id" in film
             assert "title" in film
             assert "imdb_rating" in film
+
+
+# --- Тесты пакетного получения карточек ---
+async def test_films_batch(session):
+    ids = [
+        "ff750819-6004-426b-ae66-19a3ba15adcc",
+        "99999999-9999-9999-9999-999999999999",
+        "ff750819-6004-426b-ae66-19a3ba15adcc",
+    ]
+    url = test_settings.service_url + "/api/v1/films/batch"
+    async with session.post(url, json={"ids": ids}) as response:
+        assert response.status == HTTPStatus.OK
+        body = await response.json()
+
+    # порядок запроса сохраняется, ненайденный фильм помечен null
+    assert [item["id"] for item in body] == ids
+    assert body[0]["film"]["id"] == ids[0]
+    assert body[1]["film"] is None
+    assert body[2] == body[0]
+
+
+async def test_films_batch_empty(session):
+    url = test_settings.service_url + "/api/v1/films/batch"
+    async with session.post(url, json={"ids": []}) as response:
+        assert response.status == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+# --- Тесты обхода списка курсором ---
+async def test_films_cursor(make_raw_get_request):
+    params = {"sort": "-imdb_rating", "page_size": 10, "cursor": ""}
+    first = await make_raw_get_request("/api/v1/films/", params)
+    assert first.status == HTTPStatus.OK
+    first_page = await first.json()
+    cursor = first.headers.get("X-Next-Cursor")
+    assert len(first_page) == 10
+    assert cursor
+
+    second = await make_raw_get_request("/api/v1/films/", {**params, "cursor": cursor})
+    assert second.status == HTTPStatus.OK
+    second_page = await second.json()
+    assert not {f["id"] for f in first_page} & {f["id"] for f in second_page}
+
+
+async def test_films_bad_cursor(make_raw_get_request):
+    response = await make_raw_get_request("/api/v1/films/", {"cursor": "not-a-cursor"})
+    assert response.status == HTTPStatus.BAD_REQUEST
+
+
+# --- Тесты автодополнения ---
+@pytest.mark.parametrize(
+    "params, expected_status",
+    [
+        ({"prefix": "sta", "size": 5}, HTTPStatus.OK),
+        ({"prefix": ""}, HTTPStatus.UNPROCESSABLE_ENTITY),
+        ({"prefix": "sta", "size": 100}, HTTPStatus.UNPROCESSABLE_ENTITY),
+    ],
+)
+async def test_films_suggest(make_raw_get_request, params, expected_status):
+    response = await make_raw_get_request("/api/v1/films/suggest", params)
+    assert response.status == expected_status
+    if expected_status == HTTPStatus.OK:
+        body = await response.json()
+        assert len(body) <= params["size"]
+        assert all(set(item) == {"id", "title"} for item in body)
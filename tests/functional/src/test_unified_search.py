@@ -0,0 +1,29 @@
+import pytest
+from http import HTTPStatus
+
+
+# --- Тесты общего поиска по фильмам и персонам ---
+@pytest.mark.parametrize(
+    "params, expected_status",
+    [
+        ({"query": "Star", "size": 5}, HTTPStatus.OK),
+        ({"query": "NonExistingQuery"}, HTTPStatus.OK),
+        ({"query": ""}, HTTPStatus.UNPROCESSABLE_ENTITY),
+        ({"query": "Star", "size": 100}, HTTPStatus.UNPROCESSABLE_ENTITY),
+    ],
+)
+async def test_unified_search(make_raw_get_request, params, expected_status):
+    response = await make_raw_get_request("/api/v1/search", params)
+    assert response.status == expected_status
+
+    if expected_status == HTTPStatus.OK:
+        body = await response.json()
+        assert set(body) == {"films", "persons"}
+        assert len(body["films"]) <= params.get("size", 10)
+        assert len(body["persons"]) <= params.get("size", 10)
+
+
+async def test_unified_search_matches_films_search(make_raw_get_request):
+    combined = await make_raw_get_request("/api/v1/search", {"query": "Star", "size": 10})
+    films = await make_raw_get_request("/api/v1/films/search", {"query": "Star", "page_size": 10})
+    assert (await combined.json())["films"] == await films.json()